@@ -0,0 +1,193 @@
+"""
+Admission control for the CPU-bound endpoints.
+
+Without a limit, a burst of large inbox refreshes fills FastAPI's thread
+pool and every request (health checks included) gets slow together. Each
+AdmissionLimiter caps the work an endpoint runs at once, measured in
+messages, and keeps a bounded FIFO queue of waiting requests:
+
+- a request that fits under the capacity runs immediately;
+- otherwise it waits in the queue, up to ADMISSION_MAX_WAIT_MS;
+- if the queue already holds max_queue messages it is rejected at once
+  with 429, and a request that waited too long gets 503. Both carry a
+  Retry-After estimated from recent service times.
+
+A request heavier than the whole capacity is counted as exactly the
+capacity, so it runs alone instead of being rejected forever.
+
+Limits come from ADMISSION_<NAME>_CAPACITY / ADMISSION_<NAME>_QUEUE, where
+NAME is the limiter name upper-cased with dashes as underscores (e.g.
+ADMISSION_PREDICT_SMS_CAPACITY).
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_CONTROL", "1") != "0"
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "2000"))
+ADMISSION_MAX_RETRY_AFTER = 60
+
+
+def _env_int(name, suffix, default):
+    key = f"ADMISSION_{name.upper().replace('-', '_')}_{suffix}"
+    return int(os.getenv(key, str(default)))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code, message, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("weight", "future")
+
+    def __init__(self, weight, future):
+        self.weight = weight
+        self.future = future
+
+
+class AdmissionLimiter:
+    """Weighted concurrency limit with a bounded wait queue
+
+    Runs on the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, name, capacity, max_queue, max_wait_ms=ADMISSION_MAX_WAIT_MS,
+                 enabled=ADMISSION_ENABLED):
+        self.name = name
+        self.capacity = max(1, _env_int(name, "CAPACITY", capacity))
+        self.max_queue = max(0, _env_int(name, "QUEUE", max_queue))
+        self.max_wait = max_wait_ms / 1000.0
+        self.enabled = enabled
+        self.in_flight = 0
+        self.running = 0
+        self.queued_weight = 0
+        self._waiters = deque()
+        self._unit_seconds = None  # EWMA of service time per message
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    def _weight(self, messages):
+        return min(max(1, int(messages)), self.capacity)
+
+    def retry_after(self):
+        """Seconds until the queued work has likely drained"""
+        if self._unit_seconds is None:
+            return 1
+        estimate = self._unit_seconds * (self.queued_weight + self.in_flight)
+        return max(1, min(ADMISSION_MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    @asynccontextmanager
+    async def slot(self, messages):
+        """Hold ``messages`` worth of capacity for the duration of the block"""
+        if not self.enabled:
+            yield
+            return
+        weight = await self.acquire(messages)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(weight, time.monotonic() - started)
+
+    async def acquire(self, messages):
+        weight = self._weight(messages)
+        if not self._waiters and self.in_flight + weight <= self.capacity:
+            self._admit(weight, 0.0)
+            return weight
+
+        if self.queued_weight + weight > self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(429, f"{self.name} queue is full", self.retry_after())
+
+        waiter = _Waiter(weight, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self.queued_weight += weight
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.max_wait)
+        except BaseException:
+            # Cancelled (client went away): give back whatever we hold
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(weight)
+            else:
+                self._drop(waiter)
+            raise
+        if waiter.future.done():
+            self._record_wait(time.monotonic() - started)
+            return weight
+
+        self._drop(waiter)
+        self.rejected_timeout += 1
+        raise AdmissionRejected(503, f"{self.name} is overloaded", self.retry_after())
+
+    def _admit(self, weight, waited):
+        self.in_flight += weight
+        self.running += 1
+        self.admitted += 1
+        self._record_wait(waited)
+
+    def _record_wait(self, waited):
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+
+    def _drop(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return
+        self.queued_weight -= waiter.weight
+        waiter.future.cancel()
+        self._wake()
+
+    def release(self, weight, duration=None):
+        self.in_flight -= weight
+        self.running -= 1
+        if duration is not None:
+            per_unit = duration / weight
+            if self._unit_seconds is None:
+                self._unit_seconds = per_unit
+            else:
+                self._unit_seconds = 0.8 * self._unit_seconds + 0.2 * per_unit
+        self._wake()
+
+    def _wake(self):
+        # Strict FIFO: a heavy request at the head is not overtaken
+        while self._waiters and self.in_flight + self._waiters[0].weight <= self.capacity:
+            waiter = self._waiters.popleft()
+            self.queued_weight -= waiter.weight
+            self.in_flight += waiter.weight
+            self.running += 1
+            self.admitted += 1
+            waiter.future.set_result(None)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "capacity": self.capacity,
+            "max_queue": self.max_queue,
+            "max_wait_ms": self.max_wait * 1000,
+            "in_flight": self.in_flight,
+            "running_requests": self.running,
+            "queued_requests": len(self._waiters),
+            "queued_messages": self.queued_weight,
+            "admitted": self.admitted,
+            "queued_total": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_ms": self.total_wait / self.admitted * 1000 if self.admitted else 0.0,
+            "max_wait_ms_seen": self.max_wait_seen * 1000,
+            "retry_after_s": self.retry_after(),
+        }
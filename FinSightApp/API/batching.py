@@ -0,0 +1,160 @@
+"""
+Dynamic micro-batching for the spam model.
+
+The mobile app scans messages with one /predict-spam request per message,
+so under load the model would be called thousands of times a second with a
+single row each. MicroBatcher collects concurrent requests for a short
+window (or until a batch is full), runs one forward pass over all of their
+messages and hands every caller back its own slice of the results.
+"""
+
+import asyncio
+import os
+import time
+
+SPAM_BATCHING_ENABLED = os.getenv("SPAM_BATCHING", "1") != "0"
+SPAM_BATCH_MAX_SIZE = int(os.getenv("SPAM_BATCH_MAX_SIZE", "64"))
+SPAM_BATCH_MAX_WAIT_MS = float(os.getenv("SPAM_BATCH_MAX_WAIT_MS", "5"))
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """Coalesce concurrent scoring requests into shared model calls.
+
+    ``run_batch`` is a blocking function taking a list of messages and
+    returning one result per message. It runs in the default executor so
+    the event loop keeps accepting requests while the model is busy.
+    """
+
+    def __init__(self, run_batch, max_batch_size=64, max_wait_ms=5.0):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._loop = None
+        self._queue = None
+        self._held = None  # Request that did not fit the last batch; starts the next one
+        self._worker = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.batches = 0
+        self.requests = 0
+        self.messages = 0
+        self.max_batch_seen = 0
+        self.bypassed_requests = 0
+        self.batch_size_counts = {bound: 0 for bound in BATCH_SIZE_BUCKETS}
+        self.batch_size_counts["+Inf"] = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def _ensure_worker(self):
+        # The queue is bound to the serving loop; recreate it if the app is
+        # driven by a new loop (e.g. a fresh test client).
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._held = None
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, messages):
+        """Score ``messages`` as part of the next batch and return their results"""
+        messages = list(messages)
+        if not messages:
+            return []
+
+        loop = asyncio.get_running_loop()
+        if len(messages) >= self.max_batch_size:
+            # Already a full batch on its own: no point waiting for company
+            self.bypassed_requests += 1
+            self._record_batch(len(messages), [0.0])
+            return await loop.run_in_executor(None, self.run_batch, messages)
+
+        self._ensure_worker()
+        future = loop.create_future()
+        await self._queue.put((messages, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._held is not None:
+                pending, self._held = [self._held], None
+            else:
+                pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while size < self.max_batch_size:
+                if not self._queue.empty():
+                    item = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if size + len(item[0]) > self.max_batch_size:
+                    # Never past the cap: the request waits for the next batch
+                    self._held = item
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            started = time.perf_counter()
+            self._record_batch(size, [started - queued for _, _, queued in pending])
+
+            texts = [message for messages, _, _ in pending for message in messages]
+            try:
+                results = await loop.run_in_executor(None, self.run_batch, texts)
+            except Exception as e:
+                for _, future, _ in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for messages, future, _ in pending:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(messages)])
+                offset += len(messages)
+
+    def _record_batch(self, size, waits):
+        self.batches += 1
+        self.requests += len(waits)
+        self.messages += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        for bound in BATCH_SIZE_BUCKETS:
+            if size <= bound:
+                self.batch_size_counts[bound] += 1
+                break
+        else:
+            self.batch_size_counts["+Inf"] += 1
+        for wait in waits:
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+
+    def stats(self):
+        """Batch sizes achieved and queue waiting times so far"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "requests": self.requests,
+            "messages": self.messages,
+            "bypassed_requests": self.bypassed_requests,
+            "avg_batch_size": self.messages / self.batches if self.batches else 0.0,
+            "max_batch_size_seen": self.max_batch_seen,
+            "batch_size_histogram": {
+                f"<={bound}" if bound != "+Inf" else f">{BATCH_SIZE_BUCKETS[-1]}": count
+                for bound, count in self.batch_size_counts.items()
+            },
+            "avg_queue_wait_ms": (
+                self.queue_wait_total / self.requests * 1000.0 if self.requests else 0.0
+            ),
+            "max_queue_wait_ms": self.queue_wait_max * 1000.0,
+        }
@@ -0,0 +1,142 @@
+"""
+Measure what the /metrics instrumentation costs on the hot paths.
+
+Usage (from FinSightApp/API):
+    python bench_metrics.py [--budget 3.0]
+
+A/B timings of whole requests are too noisy to resolve a microsecond, so
+for each path the exact instrumentation it adds is timed on its own and
+compared with the time of the path itself:
+- summarize(): the sampled parse_sms wrapper per message + one stage timer
+- predict_messages() with a stub model: 3 clock reads + 4 observations
+- a full ASGI request to /predict-sms: the metrics middleware (measured
+  around a no-op ASGI app) and the serialize timer
+The script exits 1 if any path exceeds --budget percent. The stub model
+answers in microseconds, so the predict_messages ratio is a worst case;
+a real backend's forward pass is orders of magnitude slower. Runs
+offline; no model file or server is needed.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+import main
+import metrics
+from bench_parallel_parse import load_messages
+from spam_model import LoadedModel
+
+
+class StubTokenizer:
+    def texts_to_sequences(self, texts):
+        return [[hash(word) % 40 + 2 for word in text.lower().split()] for text in texts]
+
+
+class StubLabelEncoder:
+    classes_ = np.array(["ham", "spam"], dtype=object)
+
+
+class StubModel:
+    name = "stub"
+    input_shape = (None, 50)
+    output_shape = (None, 1)
+
+    def predict(self, batch):
+        return (np.asarray(batch, dtype=np.float32).mean(axis=1, keepdims=True) / 42).clip(0, 1)
+
+
+def per_call(func, number, repeat=5):
+    """Best seconds per call of ``func`` over ``repeat`` runs of ``number`` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def report(label, path_seconds, cost_seconds, budget):
+    overhead = cost_seconds / path_seconds * 100
+    flag = "OK" if overhead <= budget else "OVER BUDGET"
+    print(f"{label:<34} {path_seconds * 1e6:>11.1f} {cost_seconds * 1e6:>9.2f} {overhead:>8.3f}%  {flag}")
+    return overhead <= budget
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--budget", type=float, default=3.0, help="allowed overhead in percent")
+    args = parser.parse_args()
+
+    main.spam_model.loaded = LoadedModel(StubTokenizer(), StubLabelEncoder(), 50, StubModel())
+    main.spam_model.state = "ready"
+    inbox = load_messages(args.messages)
+    main.summarize(inbox)  # learn templates
+
+    # Primitive costs
+    histogram = metrics.STAGE_SECONDS.labels("bench")
+    observe = per_call(lambda: histogram.observe(0.001), 100000)
+    clock = per_call(time.perf_counter, 100000)
+    noop = lambda sms: None
+    wrapped = metrics.sampled_timer(noop, "bench")
+    wrapper = max(0.0, per_call(lambda: wrapped("x"), 100000) - per_call(lambda: noop("x"), 100000))
+
+    def timer():
+        with metrics.stage_timer("bench"):
+            pass
+    stage = per_call(timer, 100000)
+    print(f"observe {observe * 1e9:.0f} ns, clock read {clock * 1e9:.0f} ns, "
+          f"sampled wrapper {wrapper * 1e9:.0f} ns/call, stage timer {stage * 1e9:.0f} ns\n")
+
+    print(f"{'path':<34} {'path µs':>11} {'added µs':>9} {'overhead':>9}")
+    ok = report(f"summarize ({args.messages} messages)",
+                per_call(lambda: main.summarize(inbox), 1),
+                args.messages * wrapper + stage, args.budget)
+    for size in (1, 64):
+        batch = inbox[:size]
+        ok &= report(f"predict_messages ({size} msg)",
+                     per_call(lambda: main.predict_messages(batch), 2000 // size),
+                     3 * clock + 4 * observe, args.budget)
+
+    async def requests(app, count, body):
+        import httpx
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            for _ in range(count):
+                await client.post("/predict-sms", json=body)
+            return (time.perf_counter() - started) / count
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def asgi_calls(app, count):
+        scope = {"type": "http", "path": "/predict-sms", "method": "POST", "app": main.app}
+        started = time.perf_counter()
+        for _ in range(count):
+            await app(scope, receive, send)
+        return (time.perf_counter() - started) / count
+
+    request = min(asyncio.run(requests(main.app, 200, {"messages": inbox[:20]})) for _ in range(3))
+    with_middleware = metrics.MetricsMiddleware(noop_app)
+    middleware = max(0.0, min(asyncio.run(asgi_calls(with_middleware, 20000)) for _ in range(3))
+                     - min(asyncio.run(asgi_calls(noop_app, 20000)) for _ in range(3)))
+    ok &= report("POST /predict-sms (20 msg)", request, middleware + stage, args.budget)
+
+    print("✅ within budget" if ok else f"⚠️ some paths exceed the {args.budget}% budget")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
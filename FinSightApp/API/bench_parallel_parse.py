@@ -0,0 +1,85 @@
+"""
+Benchmark inline vs process-pool SMS parsing to pick
+SMS_PARSE_PARALLEL_THRESHOLD for a machine.
+
+Usage (from FinSightApp/API):
+    python bench_parallel_parse.py
+    python bench_parallel_parse.py --workers 4 --chunk-size 2000 --sizes 1000,5000,20000
+
+Messages are the golden corpus with every digit re-drawn, so operator
+templates repeat the way they do in a real inbox. Both modes start with a
+warm template cache / warm pool; the reported time is the best of --repeat
+runs. The crossover is the smallest size from which the pool stays faster.
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+from parallel_parse import SMS_PARSE_CHUNK_SIZE, SMS_PARSE_WORKERS, ParsePool
+from sms_parser import parse_sms
+from sms_templates import SMS_TEMPLATE_CACHE_ENABLED, TemplateParser
+
+
+def load_messages(count, seed=0, path="golden_sms_corpus.json"):
+    with open(path, encoding="utf-8") as f:
+        corpus = [entry["sms"] for entry in json.load(f)]
+    rng = random.Random(seed)
+    redraw = lambda match: str(rng.randint(0, 9))
+    return [re.sub(r"\d", redraw, rng.choice(corpus)) for _ in range(count)]
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(SMS_PARSE_WORKERS, 2))
+    parser.add_argument("--chunk-size", type=int, default=SMS_PARSE_CHUNK_SIZE)
+    parser.add_argument("--sizes", default="500,1000,2000,5000,10000,20000,50000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    messages = load_messages(max(sizes))
+    inline_parse = TemplateParser(verify_rate=0).parse if SMS_TEMPLATE_CACHE_ENABLED else parse_sms
+    pool = ParsePool(workers=args.workers, threshold=1, chunk_size=args.chunk_size)
+    inline = ParsePool(workers=0)
+
+    pool.warmup()
+    # Let the inline parser and every worker learn the templates first
+    inline.accumulate(messages, inline_parse)
+    for _ in range(args.workers):
+        pool.accumulate(messages[:min(len(messages), 20000)])
+
+    print(f"workers={args.workers} chunk_size={args.chunk_size} templates={SMS_TEMPLATE_CACHE_ENABLED}")
+    print(f"{'messages':>9} {'inline ms':>10} {'pool ms':>10} {'speedup':>8}")
+    crossover = None
+    for size in sizes:
+        batch = messages[:size]
+        inline_s = best_time(lambda: inline.accumulate(batch, inline_parse), args.repeat)
+        pool_s = best_time(lambda: pool.accumulate(batch), args.repeat)
+        speedup = inline_s / pool_s
+        print(f"{size:>9} {inline_s * 1000:>10.1f} {pool_s * 1000:>10.1f} {speedup:>7.2f}x")
+        if speedup > 1 and crossover is None:
+            crossover = size
+        elif speedup <= 1:
+            crossover = None
+    pool.shutdown()
+
+    if crossover is None:
+        print("Pool never faster here; keep the pool disabled (SMS_PARSE_WORKERS=1)")
+    else:
+        print(f"Crossover: pool faster from ~{crossover} messages (SMS_PARSE_PARALLEL_THRESHOLD={crossover})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Measure what the profiling hook costs on requests that are not profiled.
+
+Usage (from FinSightApp/API):
+    python bench_profiling.py [--budget 0.5]
+
+An unprofiled request pays for the middleware's trigger check (the
+X-Profile header lookup and, with sampling on, one random draw), and every
+run_in_threadpool call pays for one context variable lookup. Each is
+timed on its own, around no-op code, and compared with a whole
+/predict-sms request. The script exits 1 if the added time exceeds
+--budget percent. Runs offline; no model file or server is needed.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import main
+import profiling
+from bench_metrics import per_call
+from bench_parallel_parse import load_messages
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=0.5, help="allowed overhead in percent")
+    args = parser.parse_args()
+
+    inbox = load_messages(20)
+    headers = [(b"host", b"bench"), (b"content-type", b"application/json"), (b"content-length", b"1000"),
+               (b"user-agent", b"okhttp/4.9.2"), (b"accept-encoding", b"gzip")]
+    scope = {"type": "http", "path": "/predict-sms", "method": "POST", "headers": headers, "app": main.app}
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def asgi_calls(app, count):
+        started = time.perf_counter()
+        for _ in range(count):
+            await app(scope, receive, send)
+        return (time.perf_counter() - started) / count
+
+    async def requests(count):
+        import httpx
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            for _ in range(count):
+                await client.post("/predict-sms", json={"messages": inbox})
+            return (time.perf_counter() - started) / count
+
+    bare = min(asyncio.run(asgi_calls(noop_app, 20000)) for _ in range(3))
+    # Token set and sampling on, so both checks run; the draw never wins
+    middleware = profiling.ProfilingMiddleware(noop_app, token="bench-token", sample_rate=1e-12)
+    trigger = max(0.0, min(asyncio.run(asgi_calls(middleware, 20000)) for _ in range(3)) - bare)
+    lookup = per_call(profiling._session.get, 100000)
+    request = min(asyncio.run(requests(200)) for _ in range(3))
+
+    added = trigger + lookup
+    overhead = added / request * 100
+    print(f"trigger check {trigger * 1e9:.0f} ns, run_in_threadpool lookup {lookup * 1e9:.0f} ns")
+    print(f"POST /predict-sms (20 msg): {request * 1e6:.1f} µs, added {added * 1e6:.2f} µs ({overhead:.3f}%)")
+    if overhead > args.budget:
+        print(f"⚠️ over the {args.budget}% budget")
+        return 1
+    print("✅ within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -0,0 +1,12 @@
+"""
+Offline benchmark suite for the SMS API.
+
+    python -m benchmarks.suite                     # run and print
+    python -m benchmarks.suite --save benchmarks/baselines/local.json
+    python -m benchmarks.suite --compare benchmarks/baselines/local.json
+
+sms_corpus.py generates seeded synthetic Rwandan mobile-money inboxes;
+suite.py microbenchmarks parse_sms, summarize, tokenization + padding and
+spam prediction with a stub model. Nothing needs the network or the real
+.keras model file. Run from FinSightApp/API.
+"""
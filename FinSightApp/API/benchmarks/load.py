@@ -0,0 +1,316 @@
+"""
+Concurrent load replay against the whole app, with SLO checks.
+
+Usage (from FinSightApp/API):
+    python -m benchmarks.load [--concurrency 20] [--duration 20] [--mix spam_burst=70,inbox=25,analyze=5]
+    python -m benchmarks.load --serve  # through a local uvicorn on a free port
+    python -m benchmarks.load --url http://127.0.0.1:8000  # an already running server
+    python -m benchmarks.load --slo "/predict-spam:p95<=150" --slo "*:error_rate<=0.01" --slo "total:rps>=50"
+
+Each of --concurrency virtual users replays what the mobile client does,
+picking a scenario by --mix weight and then waiting --think-ms:
+
+- spam_burst: --burst concurrent single-message /predict-spam calls, like
+  the app's Promise.all over freshly arrived messages
+- inbox: one /predict-sms post of --inbox-size messages
+- analyze: the same inbox through /analyze
+
+Messages come from the seeded synthetic corpus (sms_corpus.py). The app
+runs in-process through httpx's ASGI transport by default (its lifespan
+included), or behind a real uvicorn with --serve. Both use the benchmark
+stub spam model, so no TensorFlow or model file is needed; with --url the
+server uses whatever model it loaded.
+
+The report gives requests, errors, throughput and p50/p95/p99/max latency
+per endpoint, per burst (time until every call of a burst answered) and in
+total, for the requests that started after --warmup seconds. Every --slo
+is checked against it:
+
+    TARGET:METRIC<=VALUE or TARGET:METRIC>=VALUE
+
+TARGET is an endpoint path, "burst", "total" or "*" (every endpoint);
+METRIC is p50, p95, p99 or max (ms), rps, mps (messages/s) or
+error_rate. The exit status is 1 if any SLO is missed. With --serve the
+load generator shares the CPU with the server; size instances with --url
+against a server on its own machine.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from time import perf_counter
+
+import httpx
+import numpy as np
+
+from benchmarks.sms_corpus import generate_messages, parse_mix
+from benchmarks.suite import StubLabelEncoder, StubSpamModel, environment, load_tokenizer
+
+SCENARIOS = ("spam_burst", "inbox", "analyze")
+DEFAULT_MIX = "spam_burst=70,inbox=25,analyze=5"
+SLO_PATTERN = re.compile(r"^(?P<target>[^:]+):(?P<metric>\w+)\s*(?P<op><=|>=)\s*(?P<value>[0-9.]+)$")
+SLO_METRICS = ("p50", "p95", "p99", "max", "rps", "mps", "error_rate")
+
+
+# =======================
+# Recording
+# =======================
+
+class Recorder:
+    """Latency samples and outcomes per endpoint, after the warmup"""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.latencies = defaultdict(list)
+        self.messages = Counter()
+        self.statuses = defaultdict(Counter)
+
+    def record(self, name, started, seconds, status, messages=0):
+        if started < self.measure_from:
+            return
+        self.latencies[name].append(seconds)
+        self.messages[name] += messages
+        self.statuses[name][status] += 1
+
+    def report(self, elapsed):
+        names = sorted(self.latencies, key=lambda name: (name == "burst", name))
+        rows = {name: self._row(name, [name], elapsed) for name in names}
+        endpoints = [name for name in names if name != "burst"]
+        if endpoints:
+            rows["total"] = self._row("total", endpoints, elapsed)
+        return rows
+
+    def _row(self, name, names, elapsed):
+        latencies = np.array([s for n in names for s in self.latencies[n]]) * 1000
+        statuses = Counter()
+        for n in names:
+            statuses.update(self.statuses[n])
+        errors = sum(count for status, count in statuses.items() if not 200 <= status < 300)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": errors / len(latencies),
+            "rps": len(latencies) / elapsed,
+            "mps": sum(self.messages[n] for n in names) / elapsed,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "max": float(latencies.max()),
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        }
+
+
+# =======================
+# Traffic
+# =======================
+
+async def _post(client, recorder, path, body, messages):
+    started = perf_counter()
+    try:
+        response = await client.post(path, json=body)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 599  # Connection-level failure
+    recorder.record(path, started, perf_counter() - started, status, messages)
+    return status
+
+
+async def spam_burst(client, recorder, rng, corpus, args):
+    started = perf_counter()
+    statuses = await asyncio.gather(*[
+        _post(client, recorder, "/predict-spam", {"text": rng.choice(corpus)}, 1)
+        for _ in range(args.burst)
+    ])
+    # A burst fails with its first non-2xx call, as the client's Promise.all does
+    failed = [status for status in statuses if not 200 <= status < 300]
+    recorder.record("burst", started, perf_counter() - started, failed[0] if failed else 200)
+
+
+def _inbox(rng, corpus, size):
+    start = rng.randrange(max(1, len(corpus) - size))
+    return corpus[start:start + size]
+
+
+async def inbox(client, recorder, rng, corpus, args):
+    await _post(client, recorder, "/predict-sms", {"messages": _inbox(rng, corpus, args.inbox_size)}, args.inbox_size)
+
+
+async def analyze(client, recorder, rng, corpus, args):
+    await _post(client, recorder, "/analyze", {"messages": _inbox(rng, corpus, args.inbox_size)}, args.inbox_size)
+
+
+async def virtual_user(client, recorder, rng, corpus, mix, deadline, args):
+    scenarios = [globals()[name] for name in mix]
+    weights = list(mix.values())
+    while perf_counter() < deadline:
+        await rng.choices(scenarios, weights)[0](client, recorder, rng, corpus, args)
+        if args.think_ms:
+            await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+
+async def replay(client, corpus, mix, args):
+    started = perf_counter()
+    recorder = Recorder(started + args.warmup)
+    deadline = started + args.warmup + args.duration
+    await asyncio.gather(*[
+        virtual_user(client, recorder, random.Random(args.seed * 1000 + user), corpus, mix, deadline, args)
+        for user in range(args.concurrency)
+    ])
+    # Requests still in flight at the deadline finish and are counted
+    return recorder.report(perf_counter() - started - args.warmup)
+
+
+# =======================
+# Targets
+# =======================
+
+def install_stub_model(corpus):
+    import main
+    from spam_model import LoadedModel
+
+    tokenizer, max_len = load_tokenizer(corpus)
+    main.spam_model.install(LoadedModel(tokenizer, StubLabelEncoder(), max_len, StubSpamModel(max_len)))
+    return main.app
+
+
+async def run_in_process(app, corpus, mix, args):
+    limits = httpx.Limits(max_connections=None)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits,
+                                     timeout=args.timeout) as client:
+            return await replay(client, corpus, mix, args)
+
+
+async def run_against(url, corpus, mix, args):
+    limits = httpx.Limits(max_connections=args.concurrency * max(args.burst, 1))
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        return await replay(client, corpus, mix, args)
+
+
+def serve(app):
+    """Start uvicorn for ``app`` on a free local port in a thread; return (server, url)"""
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+# =======================
+# SLOs
+# =======================
+
+def parse_slo(text):
+    match = SLO_PATTERN.match(text.replace(" ", ""))
+    if not match or match["metric"] not in SLO_METRICS:
+        raise argparse.ArgumentTypeError(
+            f"bad SLO {text!r}; expected TARGET:METRIC<=VALUE with METRIC one of {', '.join(SLO_METRICS)}"
+        )
+    return match["target"], match["metric"], match["op"], float(match["value"])
+
+
+def check_slos(slos, rows):
+    """Print every SLO's outcome; return the missed ones"""
+    missed = []
+    for target, metric, op, limit in slos:
+        targets = [name for name in rows if name not in ("burst", "total")] if target == "*" else [target]
+        for name in targets:
+            row = rows.get(name)
+            if row is None:
+                print(f"❌ {name}:{metric}{op}{limit:g} — no requests recorded")
+                missed.append((name, metric, op, limit))
+                continue
+            value = row[metric]
+            ok = value <= limit if op == "<=" else value >= limit
+            print(f"{'✅' if ok else '❌'} {name}:{metric}{op}{limit:g} — measured {value:.4g}")
+            if not ok:
+                missed.append((name, metric, op, limit))
+    return missed
+
+
+def print_report(rows):
+    print(f"\n{'endpoint':<16} {'requests':>9} {'errors':>7} {'req/s':>8} {'msg/s':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, row in rows.items():
+        print(f"{name:<16} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8.1f} {row['mps']:>9.0f} "
+              f"{row['p50']:>8.1f} {row['p95']:>8.1f} {row['p99']:>8.1f} {row['max']:>8.1f}")
+    for name, row in rows.items():
+        failed = {status: count for status, count in row["statuses"].items() if not status.startswith("2")}
+        if failed and name != "total":
+            print(f"⚠️ {name}: non-2xx responses {failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights")
+    parser.add_argument("--burst", type=int, default=10, help="single-message calls per spam burst")
+    parser.add_argument("--inbox-size", type=int, default=500, help="messages per inbox post")
+    parser.add_argument("--think-ms", type=float, default=100, help="mean pause between scenarios")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--serve", action="store_true", help="run the app behind a local uvicorn")
+    target.add_argument("--url", help="replay against a running server instead")
+    parser.add_argument("--slo", type=parse_slo, action="append", default=[], metavar="TARGET:METRIC<=VALUE")
+    parser.add_argument("--save", metavar="PATH", help="write the report as JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix, SCENARIOS)
+    corpus = generate_messages(max(5000, args.inbox_size * 4), args.seed)
+
+    if args.url:
+        mode = args.url
+        rows = asyncio.run(run_against(args.url, corpus, mix, args))
+    else:
+        app = install_stub_model(corpus)
+        if args.serve:
+            server, url = serve(app)
+            mode = f"uvicorn at {url} (stub model)"
+            try:
+                rows = asyncio.run(run_against(url, corpus, mix, args))
+            finally:
+                server.should_exit = True
+        else:
+            mode = "in-process ASGI (stub model)"
+            rows = asyncio.run(run_in_process(app, corpus, mix, args))
+
+    print(f"🚦 Load replay: {mode}")
+    print(f"   {args.concurrency} users, mix {args.mix}, burst {args.burst}, inbox {args.inbox_size}, "
+          f"{args.duration:g}s after {args.warmup:g}s warmup")
+    if not rows:
+        raise SystemExit("❌ No requests completed after the warmup")
+    print_report(rows)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"mode": mode, "args": {k: v for k, v in vars(args).items() if k != "slo"},
+                       "environment": environment(args.seed, False), "results": rows}, f, indent=2)
+            f.write("\n")
+        print(f"💾 Report saved to {args.save}")
+
+    if args.slo:
+        print()
+        missed = check_slos(args.slo, rows)
+        if missed:
+            raise SystemExit(f"❌ {len(missed)} SLO(s) missed")
+        print("✅ All SLOs met")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Seeded generator of synthetic Rwandan mobile-money SMS.
+
+Messages follow the shapes MTN MoMo / Airtel Money and the banks send
+(the same ones parse_sms' regexes are written for): sent, received,
+withdrawal, airtime, balance-only notices and spam. The same seed always
+gives the same corpus, so benchmark runs are comparable.
+
+    python -m benchmarks.sms_corpus --size 1000 --seed 7 > inbox.ndjson
+    python -m benchmarks.sms_corpus --size 5000 --report
+
+--report prints how parse_sms classifies each generated category, which
+is a quick check that the templates still exercise the intended rules.
+"""
+
+import argparse
+import json
+import random
+import sys
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+
+SyntheticSMS = namedtuple("SyntheticSMS", ["category", "text"])
+
+CATEGORIES = ("sent", "received", "withdraw", "airtime", "balance", "spam")
+
+# Rough shape of a real inbox: mostly payments, some noise
+DEFAULT_MIX = {"sent": 30, "received": 25, "withdraw": 12, "airtime": 13, "balance": 10, "spam": 10}
+
+# How the transaction date is written; each one hits a different DATE_PATTERNS entry
+DATE_FORMATS = {
+    "iso_time": "at {:%Y-%m-%d %H:%M:%S}",   # "at 2025-07-05 17:12:24"
+    "iso": "on {:%Y-%m-%d}",                 # "on 2025-07-05"
+    "long": "on {d.day} {d:%B %Y}",          # "on 5 July 2025"
+    "slash": "on {:%d/%m/%Y}",               # "on 05/07/2025"
+}
+
+# How amounts are written; "prefix" ("RWF 25,000") is what some banks send
+# and only parses when another amount follows the currency
+AMOUNT_FORMATS = ("comma", "plain", "prefix")
+
+FIRST_NAMES = ("Jean", "Aline", "Eric", "Divine", "Patrick", "Claudine", "Emmanuel", "Grace",
+               "Olivier", "Josiane", "Innocent", "Diane", "Fabrice", "Sandrine")
+LAST_NAMES = ("Habimana", "Uwase", "Niyonzima", "Mukamana", "Nshimiyimana", "Ingabire",
+              "Mugisha", "Uwimana", "Hakizimana", "Umutoni", "Bizimana", "Iradukunda")
+MERCHANTS = ("Simba Supermarket", "REG Cashpower", "WASAC", "Kigali Bus Services", "CANAL+ Rwanda",
+             "Java House Kigali", "Sawa Citi", "Irembo", "RSSB", "Kisimenti Pharmacy")
+PAYERS = ("EMPLOYER SALARY", "COOPERATIVE PAYMENT", "RRA REFUND", "UR BURSARY", "SACCO Kicukiro")
+BANKS = ("BK", "Equity", "I&M", "Access Bank", "Cogebanque", "BPR")
+AGENTS = ("Nyabugogo", "Remera", "Kimironko", "Kicukiro Centre", "Musanze", "Huye", "Rubavu")
+SPAM_HOSTS = ("bit.ly/momo-bonus", "mtn-rw-promo.com", "tinyurl.com/rw-win", "momo-gift.net")
+
+
+class _Writer:
+    """Random fields for one corpus; every draw goes through one Random"""
+
+    def __init__(self, rng, date_formats, amount_formats, start, days):
+        self.rng = rng
+        self.date_formats = date_formats
+        self.amount_formats = amount_formats
+        self.start = start
+        self.days = days
+
+    def name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def phone(self):
+        return f"07{self.rng.choice('8923')}{self.rng.randint(0, 9999999):07d}"
+
+    def ref(self):
+        return str(self.rng.randint(10 ** 9, 10 ** 10 - 1))
+
+    def when(self):
+        moment = self.start + timedelta(seconds=self.rng.randint(0, self.days * 86400 - 1))
+        fmt = DATE_FORMATS[self.rng.choice(self.date_formats)]
+        return fmt.format(moment, d=moment)
+
+    def _value(self, low, high, step):
+        return self.rng.randrange(low, high, step)
+
+    def money(self, low=100, high=500000, step=100, fmt=None):
+        """An amount with its currency, e.g. '25,000 RWF' or 'RWF 25000'"""
+        value = self._value(low, high, step)
+        fmt = fmt or self.rng.choice(self.amount_formats)
+        digits = f"{value:,}" if fmt in ("comma", "prefix") else str(value)
+        return f"RWF {digits}" if fmt == "prefix" else f"{digits} RWF"
+
+    def balance(self):
+        # Balances keep the suffix form so the balance rules can find them
+        return self.money(0, 2000000, 1, fmt=self.rng.choice(("comma", "plain")))
+
+    def fee(self):
+        return self.money(0, 1500, 50, fmt="plain")
+
+
+def _sent(w):
+    return w.rng.choice((
+        lambda: f"*165*S*{w.money()} transferred to {w.name()} ({w.phone()}) from {w.phone()} "
+                f"{w.when()}. Fee was: {w.fee()}. New balance: {w.balance()}. TxId: {w.ref()}.",
+        lambda: f"You have sent {w.money()} to {w.name()} {w.phone()} {w.when()}. "
+                f"Your new balance: {w.balance()}. Financial Transaction Id: {w.ref()}.",
+        lambda: f"Payment of {w.money()} to {w.rng.choice(MERCHANTS)} was successful {w.when()}. "
+                f"Balance: {w.balance()}. Ref {w.ref()}",
+        lambda: f"Transfer of {w.money()} to {w.rng.choice(BANKS)} account {w.ref()} completed "
+                f"{w.when()}. Remaining balance: {w.balance()}",
+        lambda: f"You paid {w.money()} to {w.rng.choice(MERCHANTS)} {w.when()}. "
+                f"Current balance: {w.balance()}",
+    ))()
+
+
+def _received(w):
+    return w.rng.choice((
+        lambda: f"You have received {w.money()} from {w.name()} ({w.phone()}) {w.when()}. "
+                f"New balance: {w.balance()}. Financial Transaction Id: {w.ref()}.",
+        lambda: f"{w.money()} has been credited to your account from {w.rng.choice(PAYERS)} "
+                f"{w.when()}. Current balance: {w.balance()}",
+        lambda: f"Deposit of {w.money()} by agent {w.rng.choice(AGENTS)} {w.when()}. "
+                f"New balance: {w.balance()}",
+        lambda: f"Y'ello! You received your salary of {w.money()} from {w.rng.choice(PAYERS)} "
+                f"{w.when()}. Your balance is {w.balance()}",
+    ))()
+
+
+def _withdraw(w):
+    return w.rng.choice((
+        lambda: f"You have withdrawn {w.money()} from agent {w.rng.choice(AGENTS)} ({w.phone()}) "
+                f"{w.when()}. Fee: {w.fee()}. New balance: {w.balance()}. TxId: {w.ref()}",
+        lambda: f"Cash withdrawal of {w.money()} at {w.rng.choice(BANKS)} ATM {w.rng.choice(AGENTS)} "
+                f"{w.when()}. Balance: {w.balance()}",
+        lambda: f"Withdrawn {w.money()} at agent {w.when()}. Remaining balance: {w.balance()}",
+    ))()
+
+
+def _airtime(w):
+    return w.rng.choice((
+        lambda: f"You have bought {w.money(100, 20000)} of airtime {w.when()}. "
+                f"Your new balance: {w.balance()}",
+        lambda: f"Airtime purchase of {w.money(100, 20000)} for {w.phone()} successful {w.when()}. "
+                f"Balance: {w.balance()}",
+        lambda: f"Internet bundle {w.rng.choice(('1GB', '5GB', 'Unlimited week'))} bought for "
+                f"{w.money(500, 30000)} {w.when()}. New balance: {w.balance()}",
+    ))()
+
+
+def _balance(w):
+    return w.rng.choice((
+        lambda: f"Your balance is {w.balance()} {w.when()}. Dial *182# for more services.",
+        lambda: f"Y'ello. Current balance: {w.balance()}. Thank you for using MoMo.",
+        lambda: f"{w.rng.choice(BANKS)}: account {w.ref()} new balance {w.balance()} {w.when()}",
+    ))()
+
+
+def _spam(w):
+    return w.rng.choice((
+        lambda: f"Congratulations! You won {w.money(100000, 5000000, 50000)}. "
+                f"Click {w.rng.choice(SPAM_HOSTS)} to claim {w.when()}",
+        lambda: f"URGENT: your MoMo account will be blocked. Send your PIN to {w.phone()} now.",
+        lambda: f"You have received a gift of {w.money(10000, 500000, 10000)}! "
+                f"Call {w.phone()} to claim your prize today",
+        lambda: f"Dear customer, MTN promo: dial *{w.rng.randint(100, 999)}# and win "
+                f"{w.money(50000, 1000000, 50000)} cash. Visit {w.rng.choice(SPAM_HOSTS)}",
+    ))()
+
+
+WRITERS = {
+    "sent": _sent,
+    "received": _received,
+    "withdraw": _withdraw,
+    "airtime": _airtime,
+    "balance": _balance,
+    "spam": _spam,
+}
+
+
+def parse_mix(text, categories=CATEGORIES):
+    """'sent=30,spam=10' -> {'sent': 30.0, 'spam': 10.0}"""
+    mix = {}
+    for part in text.split(","):
+        category, _, weight = part.partition("=")
+        category = category.strip()
+        if category not in categories:
+            raise ValueError(f"unknown category {category!r}; expected one of {', '.join(categories)}")
+        mix[category] = float(weight or 1)
+    return mix
+
+
+def generate_corpus(size, seed=0, mix=None, date_formats=tuple(DATE_FORMATS),
+                    amount_formats=AMOUNT_FORMATS, start=datetime(2025, 1, 1), days=365):
+    """``size`` SyntheticSMS drawn from ``mix`` (category -> weight)"""
+    mix = dict(DEFAULT_MIX if mix is None else mix)
+    for fmt in date_formats:
+        if fmt not in DATE_FORMATS:
+            raise ValueError(f"unknown date format {fmt!r}")
+    for fmt in amount_formats:
+        if fmt not in AMOUNT_FORMATS:
+            raise ValueError(f"unknown amount format {fmt!r}")
+
+    rng = random.Random(seed)
+    writer = _Writer(rng, tuple(date_formats), tuple(amount_formats), start, days)
+    categories = list(mix)
+    weights = [mix[category] for category in categories]
+    picks = rng.choices(categories, weights, k=size)
+    return [SyntheticSMS(category, WRITERS[category](writer)) for category in picks]
+
+
+def generate_messages(size, seed=0, **kwargs):
+    """Just the texts of generate_corpus()"""
+    return [sms.text for sms in generate_corpus(size, seed, **kwargs)]
+
+
+def classification_report(corpus):
+    """{category: Counter of parse_sms types}"""
+    from sms_parser import parse_sms
+
+    report = {}
+    for sms in corpus:
+        report.setdefault(sms.category, Counter())[parse_sms(sms.text)["type"]] += 1
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", type=parse_mix, default=None, help="e.g. sent=30,received=25,spam=10")
+    parser.add_argument("--date-formats", default=",".join(DATE_FORMATS))
+    parser.add_argument("--amount-formats", default=",".join(AMOUNT_FORMATS))
+    parser.add_argument("--report", action="store_true", help="print parse_sms types per category instead")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(
+        args.size, args.seed, args.mix,
+        date_formats=args.date_formats.split(","),
+        amount_formats=args.amount_formats.split(","),
+    )
+    if args.report:
+        for category, types in classification_report(corpus).items():
+            print(f"{category:<9} " + ", ".join(f"{t}={n}" for t, n in types.most_common()))
+        return
+    for sms in corpus:
+        sys.stdout.write(json.dumps({"text": sms.text, "category": sms.category}, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Function-level benchmarks for the SMS API, with JSON baselines.
+
+Usage (from FinSightApp/API):
+    python -m benchmarks.suite [--quick] [--only parse_sms,summarize]
+    python -m benchmarks.suite --save benchmarks/baselines/local.json
+    python -m benchmarks.suite --compare benchmarks/baselines/local.json [--threshold 0.10]
+
+Every benchmark runs on a seeded synthetic inbox (sms_corpus.py), is
+auto-ranged to take at least 0.2 s per repeat, and reports the
+best and median time per call over --repeat repeats. --compare reruns the
+suite and flags every benchmark whose best time grew by more than
+--threshold (relative) as a regression; the exit status is 1 if any did.
+Best-of-N is compared because it is the least noisy statistic for CPU-bound
+code; baselines are only comparable on the same machine and settings,
+which are recorded in the file and checked.
+
+Spam prediction uses a stub model (a fixed random projection of the
+padded ids), so predict_messages is measured without TensorFlow or the
+.keras file. The tokenizer is the pickled one from model/ when present.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.sms_corpus import generate_corpus, generate_messages
+
+FORMAT_VERSION = 1
+
+# Settings that change what is being measured; recorded with every baseline
+SETTINGS_ENV = (
+    "SMS_TEMPLATE_CACHE", "SMS_PARSE_WORKERS", "SMS_PARSE_PARALLEL_THRESHOLD",
+    "SPAM_LENGTH_BUCKETS", "METRICS", "METRICS_PARSE_SAMPLE",
+)
+
+
+# =======================
+# Stub spam model
+# =======================
+
+class StubLabelEncoder:
+    classes_ = np.array(["ham", "spam"], dtype=object)
+
+
+class StubSpamModel:
+    """Deterministic stand-in with the real model's input/output shapes"""
+
+    name = "stub"
+
+    def __init__(self, max_len, vocab_size=10000, seed=0):
+        self.input_shape = (None, max_len)
+        self.output_shape = (None, 1)
+        self.weights = np.random.default_rng(seed).standard_normal(vocab_size).astype(np.float32)
+
+    def predict(self, batch):
+        scores = self.weights[np.asarray(batch) % len(self.weights)].mean(axis=1, keepdims=True)
+        return 1 / (1 + np.exp(-scores))
+
+
+def load_tokenizer(messages):
+    """(tokenizer, max_len): the pickled artifacts, or a vocabulary fitted on ``messages``"""
+    from inference_backends import SPAM_MODEL_DIR, PickledTokenizer, load_artifacts, text_to_word_sequence
+
+    try:
+        tokenizer, _, max_len = load_artifacts(SPAM_MODEL_DIR, lightweight=True)
+        return tokenizer, max_len
+    except (OSError, ImportError) as e:
+        print(f"⚠️ Pickled tokenizer unavailable ({e}); fitting one on the corpus")
+
+    tokenizer = PickledTokenizer()
+    tokenizer.__dict__.update(
+        num_words=10000, oov_token="<OOV>", lower=True, split=" ", char_level=False,
+        filters='!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n', word_index={"<OOV>": 1},
+    )
+    for message in messages:
+        for word in text_to_word_sequence(message, tokenizer.filters):
+            tokenizer.word_index.setdefault(word, len(tokenizer.word_index) + 1)
+    return tokenizer, 50
+
+
+# =======================
+# Timing
+# =======================
+
+def measure(func, items, repeat):
+    """Timing record for ``func`` (which handles ``items`` messages per call)"""
+    func()  # warm caches, templates and lazy imports
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()  # enough calls for >= 0.2 s per repeat
+    times = [total / number for total in timer.repeat(repeat, number)]
+    best = min(times)
+    return {
+        "items": items,
+        "number": number,
+        "repeat": repeat,
+        "best_s": best,
+        "median_s": statistics.median(times),
+        "per_item_us": best / items * 1e6,
+        "items_per_s": items / best,
+    }
+
+
+# =======================
+# Benchmarks
+# =======================
+
+def build_benchmarks(seed, quick):
+    """[(name, items, func)] in run order"""
+    import main
+    from sms_parser import parse_sms
+    from sms_templates import TemplateParser
+    from spam_model import LoadedModel
+
+    sizes = (100, 1000) if quick else (100, 1000, 10000)
+    corpus = generate_messages(max(sizes), seed)
+    parse_corpus = corpus[:1000]
+
+    benchmarks = []
+
+    def parse_all(parse):
+        return lambda: [parse(sms) for sms in parse_corpus]
+
+    benchmarks.append(("parse_sms", len(parse_corpus), parse_all(parse_sms)))
+    template_parser = TemplateParser(verify_rate=0)
+    benchmarks.append(("parse_sms/templates", len(parse_corpus), parse_all(template_parser.parse)))
+
+    for size in sizes:
+        inbox = corpus[:size]
+        benchmarks.append((f"summarize/{size}", size, lambda inbox=inbox: main.summarize(inbox)))
+
+    tokenizer, max_len = load_tokenizer(corpus)
+    for size in (1, 64):
+        batch = corpus[:size]
+
+        def tokenize_pad(batch=batch):
+            return main._encode_batch(tokenizer, batch, max_len)
+
+        benchmarks.append((f"tokenize_pad/{size}", size, tokenize_pad))
+
+    main.spam_model.loaded = LoadedModel(tokenizer, StubLabelEncoder(), max_len, StubSpamModel(max_len))
+    main.spam_model.state = "ready"
+    spam = [sms.text for sms in generate_corpus(256, seed + 1, {"spam": 1, "sent": 1, "received": 1})]
+    for size in (1, 64, 256):
+        batch = spam[:size]
+        benchmarks.append((f"predict_spam/{size}", size, lambda batch=batch: main.predict_messages(batch)))
+    return benchmarks
+
+
+def environment(seed, quick):
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "seed": seed,
+        "quick": quick,
+        "settings": {name: os.environ[name] for name in SETTINGS_ENV if name in os.environ},
+    }
+
+
+def run(args):
+    only = set(args.only.split(",")) if args.only else None
+    results = {}
+    benchmarks = build_benchmarks(args.seed, args.quick)
+    print(f"{'benchmark':<24} {'items':>6} {'best ms':>10} {'median ms':>10} {'µs/item':>9} {'items/s':>11}")
+    for name, items, func in benchmarks:
+        if only and name.split("/")[0] not in only and name not in only:
+            continue
+        record = measure(func, items, args.repeat)
+        results[name] = record
+        print(f"{name:<24} {items:>6} {record['best_s'] * 1000:>10.3f} {record['median_s'] * 1000:>10.3f} "
+              f"{record['per_item_us']:>9.2f} {record['items_per_s']:>11,.0f}")
+    return results
+
+
+# =======================
+# Baselines
+# =======================
+
+def save_baseline(path, results, env):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    baseline = {
+        "format": FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": env,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"💾 Baseline saved to {path}")
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported baseline format {baseline.get('format')!r}")
+    return baseline
+
+
+def compare(baseline, results, env, threshold):
+    """Print the comparison; return the names of regressed benchmarks"""
+    old_env = baseline["environment"]
+    for key in sorted(set(old_env) | set(env)):
+        if old_env.get(key) != env.get(key):
+            print(f"⚠️ {key} differs from the baseline: {old_env.get(key)!r} -> {env.get(key)!r}")
+
+    regressions = []
+    print(f"\n{'benchmark':<24} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for name, record in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<24} {'-':>12} {record['best_s'] * 1000:>10.3f} {'new':>8}")
+            continue
+        change = record["best_s"] / old["best_s"] - 1
+        if change > threshold:
+            flag = "  ❌ REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        else:
+            flag = ""
+        print(f"{name:<24} {old['best_s'] * 1000:>12.3f} {record['best_s'] * 1000:>10.3f} {change:>+8.1%}{flag}")
+    missing = sorted(set(baseline["results"]) - set(results))
+    if missing:
+        print(f"(not run: {', '.join(missing)})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="skip the 10k-message sizes")
+    parser.add_argument("--only", help="comma-separated benchmark names or groups")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.compare) if args.compare else None
+    if baseline is not None:
+        # Rerun with the baseline's corpus so the numbers are comparable
+        args.seed = baseline["environment"]["seed"]
+        args.quick = baseline["environment"]["quick"]
+
+    env = environment(args.seed, args.quick)
+    results = run(args)
+    if args.save:
+        save_baseline(args.save, results, env)
+    if baseline is not None:
+        regressions = compare(baseline, results, env, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Throughput of the fast tokenizer against texts_to_sequences + padding.
+
+Usage (from FinSightApp/API):
+    python -m benchmarks.tokenizer [--sizes 1,64,512] [--repeat 5]
+
+The reference is the pickled tokenizer's texts_to_sequences followed by
+pad_sequences(padding='post') (keras when installed, otherwise the port in
+inference_backends and a numpy padding loop). The fast path is
+TokenEngine.encode() into its reused buffer. Both see the same seeded
+synthetic inbox; results are checked to be identical before timing.
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from benchmarks.sms_corpus import generate_messages
+from check_fast_tokenizer import reference_tokenizer
+from fast_tokenizer import TokenEngine
+from inference_backends import SPAM_MODEL_DIR, load_artifacts
+
+
+def reference_padding():
+    try:
+        from keras.preprocessing.sequence import pad_sequences
+        return lambda sequences, max_len: pad_sequences(sequences, maxlen=max_len, padding="post")
+    except ImportError:
+        def pad(sequences, max_len):
+            batch = np.zeros((len(sequences), max_len), dtype=np.int32)
+            for i, seq in enumerate(sequences):
+                seq = seq[-max_len:]
+                batch[i, :len(seq)] = seq
+            return batch
+        return pad
+
+
+def best_per_call(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,64,512")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tokenizer, source = reference_tokenizer(SPAM_MODEL_DIR)
+    max_len = load_artifacts(SPAM_MODEL_DIR, lightweight=True)[2]
+    engine = TokenEngine.from_tokenizer(tokenizer)
+    pad = reference_padding()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    messages = generate_messages(max(sizes), args.seed)
+
+    print(f"reference: {source}, max_len={max_len}")
+    print(f"{'batch':>6} {'reference msg/s':>16} {'fast msg/s':>12} {'speedup':>8}")
+    for size in sizes:
+        batch = messages[:size]
+        reference = lambda: pad(tokenizer.texts_to_sequences(batch), max_len)
+        fast = lambda: engine.encode(batch, max_len)
+        if not np.array_equal(reference(), fast()[0]):
+            raise SystemExit(f"❌ outputs differ at batch size {size}")
+        reference_s = best_per_call(reference, args.repeat)
+        fast_s = best_per_call(fast, args.repeat)
+        print(f"{size:>6} {size / reference_s:>16,.0f} {size / fast_s:>12,.0f} {reference_s / fast_s:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
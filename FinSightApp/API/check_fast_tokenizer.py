@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Exactness check for fast_tokenizer.TokenEngine
+Compares TokenEngine.encode() with texts_to_sequences + post padding on the
+golden corpus, a synthetic inbox and edge cases, for the pickled tokenizer
+and variants of its config (num_words cut-off, no OOV token, no
+lowercasing, other filters). Uses the real keras Tokenizer when keras is
+installed, otherwise the step-for-step port in inference_backends. Runs
+offline, no server or model file needed.
+"""
+
+import copy
+import json
+import os
+import sys
+
+import numpy as np
+
+from benchmarks.sms_corpus import generate_messages
+from fast_tokenizer import TokenEngine
+from inference_backends import SPAM_MODEL_DIR, load_artifacts, load_pickle
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "!!!???...",
+    "RWF\t5,000\nreceived\r\nfrom Jean",
+    "ÉCOLE Ünïcödé İstanbul ß straße",
+    "word " * 120,
+    "Congratulations!!! You WON 1,000,000 RWF. Click bit.ly/x to claim",
+    ["already", "Split", "WORDS", "rwf"],
+    [],
+]
+
+
+def reference_tokenizer(model_dir):
+    """The pickled tokenizer, as keras itself when it is installed"""
+    try:
+        import keras  # noqa: F401
+        return load_pickle(os.path.join(model_dir, "tokenizer.pkl")), "keras"
+    except ImportError:
+        return load_artifacts(model_dir, lightweight=True)[0], "inference_backends port"
+
+
+def variants(tokenizer):
+    yield "as pickled", tokenizer
+    small = copy.deepcopy(tokenizer)
+    small.num_words = 12
+    yield "num_words=12", small
+    no_oov = copy.deepcopy(tokenizer)
+    no_oov.oov_token = None
+    no_oov.num_words = 20
+    yield "no OOV token", no_oov
+    upper = copy.deepcopy(tokenizer)
+    upper.lower = False
+    yield "lower=False", upper
+    filters = copy.deepcopy(tokenizer)
+    filters.filters = ".,"
+    yield "filters='.,'", filters
+
+
+def reference_encode(tokenizer, texts, max_len):
+    sequences = tokenizer.texts_to_sequences(texts)
+    batch = np.zeros((len(texts), max_len), dtype=np.int32)
+    for i, seq in enumerate(sequences):
+        seq = seq[-max_len:]
+        batch[i, :len(seq)] = seq
+    return batch
+
+
+def check_fast_tokenizer(model_dir=SPAM_MODEL_DIR):
+    """Return (checked rows, [(variant, text, expected, actual)])"""
+    tokenizer, _ = reference_tokenizer(model_dir)
+    max_len = load_artifacts(model_dir, lightweight=True)[2]
+    with open(os.path.join(HERE, "golden_sms_corpus.json"), encoding="utf-8") as f:
+        texts = [entry["sms"] for entry in json.load(f)]
+    texts += generate_messages(2000, seed=11) + EDGE_CASES
+
+    checked = 0
+    mismatches = []
+    for name, variant in variants(tokenizer):
+        engine = TokenEngine.from_tokenizer(variant)
+        expected = reference_encode(variant, texts, max_len)
+        # Odd batch sizes exercise buffer reuse and growth
+        for start in range(0, len(texts), 97):
+            chunk = texts[start:start + 97]
+            actual, lengths = engine.encode(chunk, max_len)
+            for i, text in enumerate(chunk):
+                checked += 1
+                row = expected[start + i]
+                if not np.array_equal(actual[i], row) or lengths[i] != np.count_nonzero(row):
+                    mismatches.append((name, text, row.tolist(), actual[i].tolist()))
+    return checked, mismatches
+
+
+if __name__ == "__main__":
+    print("🧪 Fast tokenizer exactness check")
+    print("=" * 50)
+    print(f"Reference: {reference_tokenizer(SPAM_MODEL_DIR)[1]}")
+
+    checked, mismatches = check_fast_tokenizer()
+    for name, text, expected, actual in mismatches[:20]:
+        print(f"❌ [{name}] {text!r}")
+        print(f"   expected: {expected}")
+        print(f"   actual:   {actual}")
+
+    if mismatches:
+        print(f"\n❌ {len(mismatches)} of {checked} rows differ from texts_to_sequences")
+        sys.exit(1)
+    print(f"✅ All {checked} rows match texts_to_sequences + padding")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Golden corpus check for parse_sms
+Compares the compiled parser against outputs recorded from the original
+pattern-list cascade (golden_sms_corpus.json). Runs offline, no server needed.
+"""
+
+import json
+import os
+import sys
+
+from sms_parser import parse_sms
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_sms_corpus.json")
+
+def check_golden_corpus(path=CORPUS_PATH):
+    """Return the corpus entries whose parse differs from the recorded output"""
+    with open(path, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    mismatches = []
+    for entry in corpus:
+        actual = parse_sms(entry["sms"])
+        # Compare serialized forms so 0 vs 0.0 amounts count as a difference
+        if json.dumps(actual, sort_keys=True) != json.dumps(entry["expected"], sort_keys=True):
+            mismatches.append((entry, actual))
+    return corpus, mismatches
+
+if __name__ == "__main__":
+    print("🧪 parse_sms golden corpus check")
+    print("=" * 50)
+
+    corpus, mismatches = check_golden_corpus()
+    for entry, actual in mismatches[:20]:
+        print(f"❌ {entry['sms']!r}")
+        print(f"   expected: {entry['expected']}")
+        print(f"   actual:   {actual}")
+
+    if mismatches:
+        print(f"\n❌ {len(mismatches)} of {len(corpus)} messages differ from the golden output")
+        sys.exit(1)
+    print(f"✅ All {len(corpus)} messages match the golden output")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of the spam cascade's rule stage
+Runs the full spam model and the rule stage (spam_cascade.py) over the
+golden corpus and a seeded synthetic inbox and reports, per threshold
+setting, the share of messages the rules decide (model calls saved), how
+often their label agrees with the full model, and how many synthetic
+messages the rules get wrong against the generator's category (spam let
+through as ham, transactions labelled spam).
+
+Usage (from FinSightApp/API):
+    python check_spam_cascade.py [--size 5000] [--min-agreement 0.99] [--stub]
+
+Needs a loadable model (SPAM_MODEL_BACKEND / SPAM_MODEL_DIR). --stub uses
+the benchmark stub model instead, which only exercises the report: its
+labels are not a real classifier's, so agreement is meaningless with it.
+Exits 1 if agreement at the configured thresholds is below
+--min-agreement (not checked with --stub), or if /predict-spam fails with
+the cascade on and no model loaded (checked first, before any model).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.sms_corpus import generate_corpus
+from spam_cascade import SPAM_CASCADE_HAM_SCORE, SPAM_CASCADE_SPAM_CUES, SpamCascade
+from spam_model import LoadedModel, SpamModel
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_corpus(size, seed):
+    """(text, synthetic category or None) pairs"""
+    with open(os.path.join(HERE, "golden_sms_corpus.json"), encoding="utf-8") as f:
+        corpus = [(entry["sms"], None) for entry in json.load(f)]
+    return corpus + [(sms.text, sms.category) for sms in generate_corpus(size, seed)]
+
+
+def full_model_labels(texts, stub=False):
+    """(labels from the full model, model description)"""
+    import main
+
+    model = SpamModel()
+    if stub:
+        from benchmarks.suite import StubLabelEncoder, StubSpamModel
+        from inference_backends import SPAM_MODEL_DIR, load_artifacts
+        tokenizer, _, max_len = load_artifacts(SPAM_MODEL_DIR, lightweight=True)
+        model.loaded = LoadedModel(tokenizer, StubLabelEncoder(), max_len, StubSpamModel(max_len))
+        description = "stub (agreement is not meaningful)"
+    else:
+        model.load()
+        if model.loaded is None:
+            sys.exit("❌ No spam model could be loaded; install the backend or pass --stub")
+        description = model.loaded.model.name
+    main.spam_model = model
+    labels = []
+    for start in range(0, len(texts), 256):
+        labels.extend(p["label"] for p in main.predict_messages(texts[start:start + 256]))
+    return labels, description
+
+
+def check_without_model():
+    """/predict-spam with the cascade on and a model that failed to load"""
+    import asyncio
+
+    import httpx
+
+    import main
+
+    model = SpamModel(model_dir=os.path.join(HERE, "no-such-model"))
+    model.load()
+    main.spam_model, main.spam_cascade = model, SpamCascade()
+    messages = [
+        "You have received 5,000 RWF from Jean (250788123456) at 2024-05-01 10:00:00. "
+        "New balance: 12,000 RWF. TxId: 123456",
+        "Congratulations! You won a prize, click http://win.example.com to claim",
+    ]
+
+    async def post(params=""):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            return await client.post(f"/predict-spam{params}", json={"messages": messages})
+
+    try:
+        for params in ("", "?format=columnar"):
+            response = asyncio.run(post(params))
+            body = response.json()
+            stages = body.get("stages") if params else [result.get("stage") for result in body.get("results", [])]
+            if response.status_code != 200 or stages != ["unavailable"] * len(messages):
+                sys.exit(f"❌ /predict-spam{params} without a model: {response.status_code} {body}")
+    finally:
+        main.spam_cascade = None
+    print("✅ Without a model, every prediction has stage 'unavailable'\n")
+
+
+def evaluate(cascade, lowered, model_labels, categories):
+    decisions = [cascade.decide(sms_lower) for sms_lower in lowered]
+    decided = [(d["label"], m, c) for d, m, c in zip(decisions, model_labels, categories) if d is not None]
+    agree = sum(label == model for label, model, _ in decided)
+    return {
+        "rules_ham": sum(label == cascade.ham_label for label, _, _ in decided),
+        "rules_spam": sum(label == cascade.spam_label for label, _, _ in decided),
+        "saved": len(decided) / len(lowered),
+        "agreement": agree / len(decided) if decided else 1.0,
+        "spam_as_ham": sum(label == cascade.ham_label and c == "spam" for label, _, c in decided),
+        "ham_as_spam": sum(label == cascade.spam_label and c not in (None, "spam") for label, _, c in decided),
+        "decisions": decisions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000, help="synthetic messages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    parser.add_argument("--stub", action="store_true", help="use the benchmark stub model")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.size, args.seed)
+    texts = [text for text, _ in corpus]
+    categories = [category for _, category in corpus]
+    lowered = [text.lower() for text in texts]
+
+    print("🧪 Spam cascade evaluation")
+    print("=" * 50)
+    check_without_model()
+    model_labels, description = full_model_labels(texts, args.stub)
+    print(f"Model: {description}")
+    print(f"Messages: {len(texts)} ({len(texts) - args.size} golden, {args.size} synthetic)")
+    print(f"Full model labels: {model_labels.count('spam')} spam, {model_labels.count('ham')} ham\n")
+
+    configured = (SPAM_CASCADE_HAM_SCORE, SPAM_CASCADE_SPAM_CUES)
+    settings = sorted({(h, s) for h in (2, 3, 4, 5) for s in (0, 2, 3)} | {configured})
+    print(f"{'ham_score':>9} {'spam_cues':>9} {'rules ham':>10} {'rules spam':>10} "
+          f"{'saved':>7} {'agreement':>10} {'spam->ham':>9} {'ham->spam':>9}")
+    current = None
+    for ham_score, spam_cues in settings:
+        result = evaluate(SpamCascade(ham_score, spam_cues), lowered, model_labels, categories)
+        marker = "  ← configured" if (ham_score, spam_cues) == configured else ""
+        print(f"{ham_score:>9} {spam_cues:>9} {result['rules_ham']:>10} {result['rules_spam']:>10} "
+              f"{result['saved']:>6.1%} {result['agreement']:>10.2%} {result['spam_as_ham']:>9} {result['ham_as_spam']:>9}{marker}")
+        if (ham_score, spam_cues) == configured:
+            current = result
+
+    disagreements = [
+        (text, decision["label"], model)
+        for text, decision, model in zip(texts, current["decisions"], model_labels)
+        if decision is not None and decision["label"] != model
+    ]
+    for text, rule, model in disagreements[:10]:
+        print(f"❌ rules={rule} model={model}: {text[:100]!r}")
+
+    if not args.stub and current["agreement"] < args.min_agreement:
+        print(f"\n❌ Agreement {current['agreement']:.2%} is below {args.min_agreement:.2%}")
+        sys.exit(1)
+    print(f"\n✅ Rules decide {current['saved']:.1%} of messages with "
+          f"{current['agreement']:.2%} agreement with the full model")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Convert the Keras spam model for the lightweight inference backends and
+check that a converted model agrees with the original.
+
+Usage (from FinSightApp/API, with TensorFlow installed):
+    python export_model.py convert tflite
+    python export_model.py convert onnx          # needs tf2onnx
+    python export_model.py check tflite --tolerance 1e-4
+
+The check tokenizes the golden SMS corpus plus the spam samples below with
+the pickled tokenizer, runs both models on the same padded batch and fails
+(exit code 1) if any label differs or any probability is further than
+--tolerance from the Keras output.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from inference_backends import SPAM_MODEL_DIR, create_backend, load_artifacts, model_path
+
+SPAM_SAMPLES = [
+    "Congratulations! You have won 500,000 RWF. Send your PIN to 0788000000 to claim your prize",
+    "URGENT: your MoMo account will be blocked. Click http://bit.ly/xyz to verify now",
+    "You have been selected for a free loan of 1,000,000 RWF, reply YES to receive",
+    "WIN a brand new phone! Dial *123# now and pay 1000 RWF registration fee",
+    "Hi, are we still meeting at 5pm today?",
+    "Your package is waiting, pay delivery fee of 2,500 RWF to release it",
+]
+
+
+def load_corpus(path="golden_sms_corpus.json"):
+    messages = list(SPAM_SAMPLES)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            messages.extend(entry["sms"] for entry in json.load(f))
+    return messages
+
+
+def pad_batch(sequences, maxlen):
+    batch = np.zeros((len(sequences), maxlen), dtype=np.int32)
+    for i, seq in enumerate(sequences):
+        seq = seq[-maxlen:]
+        batch[i, :len(seq)] = seq
+    return batch
+
+
+def convert(backend, model_dir, allow_select_tf_ops=False):
+    import tensorflow as tf
+    from keras.models import load_model
+
+    model = load_model(model_path("keras", model_dir), compile=False)
+    _, _, max_len = load_artifacts(model_dir)
+    output = model_path(backend, model_dir)
+
+    if backend == "tflite":
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if allow_select_tf_ops:
+            # Needs the full TF runtime (flex delegate) at inference time
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS,
+                tf.lite.OpsSet.SELECT_TF_OPS,
+            ]
+        with open(output, "wb") as f:
+            f.write(converter.convert())
+    elif backend == "onnx":
+        import tf2onnx
+
+        spec = [tf.TensorSpec((None, max_len), model.inputs[0].dtype, name="input")]
+        tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=output)
+    else:
+        raise SystemExit(f"Cannot convert to {backend!r}")
+    print(f"✅ Wrote {output} ({os.path.getsize(output) / 1024:.1f} KiB)")
+
+
+def _probabilities(raw, n_classes):
+    probs = np.asarray(raw, dtype=np.float64).reshape(len(raw), -1)
+    if probs.shape[1] == 1:
+        probs = np.hstack([1 - probs, probs])
+    return probs[:, :n_classes]
+
+
+def check(backend, model_dir, tolerance, batch_size=64):
+    tokenizer, label_encoder, max_len = load_artifacts(model_dir)
+    reference = create_backend("keras", model_dir)
+    candidate = create_backend(backend, model_dir)
+    n_classes = len(label_encoder.classes_)
+
+    messages = load_corpus()
+    batch = pad_batch(tokenizer.texts_to_sequences(messages), max_len)
+    expected = np.vstack([
+        _probabilities(reference.predict(batch[i:i + batch_size]), n_classes)
+        for i in range(0, len(batch), batch_size)
+    ])
+    actual = np.vstack([
+        _probabilities(candidate.predict(batch[i:i + batch_size]), n_classes)
+        for i in range(0, len(batch), batch_size)
+    ])
+
+    diff = np.abs(expected - actual).max(axis=1)
+    label_mismatch = np.argmax(expected, axis=1) != np.argmax(actual, axis=1)
+    failed = np.flatnonzero(label_mismatch | (diff > tolerance))
+
+    print(f"📊 {backend} vs keras on {len(messages)} messages")
+    print(f"   max |Δp| = {diff.max():.2e} (tolerance {tolerance:.0e})")
+    print(f"   label mismatches: {int(label_mismatch.sum())}")
+    for i in failed[:10]:
+        print(f"   ❌ {messages[i][:60]!r}: keras={expected[i].round(6).tolist()} {backend}={actual[i].round(6).tolist()}")
+    if len(failed):
+        print(f"❌ {len(failed)} messages outside tolerance")
+        return 1
+    print("✅ Parity check passed")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["convert", "check"])
+    parser.add_argument("backend", choices=["tflite", "onnx"])
+    parser.add_argument("--model-dir", default=SPAM_MODEL_DIR)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    parser.add_argument("--allow-select-tf-ops", action="store_true",
+                        help="let the TFLite converter fall back to TF ops it cannot lower")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        convert(args.backend, args.model_dir, args.allow_select_tf_ops)
+        return 0
+    return check(args.backend, args.model_dir, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Fast JSON rendering for large responses.
+
+A /predict-spam or /analyze body for thousands of messages is mostly
+small dicts of floats; json.dumps spends as long on it as the model does
+on the batch. orjson renders the same content several times faster and
+handles numpy scalars and arrays directly. It is optional: without it the
+standard json module is used with Starlette's settings.
+"""
+
+import json
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(obj):
+    # json fallback for numpy values that orjson would handle natively
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """UTF-8 JSON bytes for ``content``"""
+    if orjson is not None:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed
+
+    Return it directly from an endpoint to also skip FastAPI's
+    jsonable_encoder pass; the content must then be plain JSON types
+    (or numpy values).
+    """
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,128 @@
+"""
+Token ids straight into a reusable int32 buffer.
+
+Keras' texts_to_sequences filters, splits and looks up every word through
+several Python layers and builds a list per message; padding then
+allocates a new matrix per call. TokenEngine precomputes everything the
+tokenizer config implies (filter translation table, num_words cut-off,
+OOV id) and does one lowercase + translate + split per message (on bytes
+for ASCII text), then
+scatters all ids of the batch into a per-thread preallocated
+(rows, max_len) buffer with padding='post' (truncating='pre', like
+pad_sequences' defaults).
+
+The ids are exactly those of texts_to_sequences; check_fast_tokenizer.py
+verifies this against the pickled tokenizer. Char-level tokenizers and
+custom analyzers are not supported (from_tokenizer returns None), and the
+caller keeps using texts_to_sequences for them.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+FAST_TOKENIZER_ENABLED = os.getenv("FAST_TOKENIZER", "1") != "0"
+
+
+class TokenEngine:
+    def __init__(self, vocab, oov_id, filters, lower=True, split=" "):
+        self.vocab = vocab  # word -> id, already limited to num_words
+        self.oov_id = oov_id  # id for unknown words, None to drop them
+        self.lower = lower
+        self.split = split
+        self.table = str.maketrans({c: split for c in filters})
+        # ASCII messages (nearly all SMS) are lowercased, filtered, split and
+        # looked up as bytes, which is several times faster than
+        # str.translate; non-ASCII vocabulary words cannot occur in them.
+        self.ascii = split.isascii() and len(split) == 1 and all(c.isascii() for c in filters)
+        if self.ascii:
+            self.byte_split = split.encode()
+            self.byte_table = bytes.maketrans(filters.encode(), self.byte_split * len(filters))
+            self.byte_vocab = {word.encode(): i for word, i in vocab.items() if word.isascii()}
+        self._local = threading.local()
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer):
+        """Engine equivalent to ``tokenizer``, or None if it cannot be matched"""
+        word_index = getattr(tokenizer, "word_index", None)
+        if not isinstance(word_index, dict):
+            return None
+        if getattr(tokenizer, "char_level", False) or getattr(tokenizer, "analyzer", None) is not None:
+            return None
+        oov_token = getattr(tokenizer, "oov_token", None)
+        oov_id = word_index.get(oov_token) if oov_token is not None else None
+        if oov_token is not None and oov_id is None:
+            # Keras would emit None ids here; leave that to the slow path
+            return None
+
+        num_words = getattr(tokenizer, "num_words", None)
+        vocab = {}
+        for word, index in word_index.items():
+            if num_words and index >= num_words:
+                if oov_id is not None:
+                    vocab[word] = oov_id
+            else:
+                vocab[word] = index
+        return cls(
+            vocab, oov_id,
+            filters=getattr(tokenizer, "filters", "") or "",
+            lower=getattr(tokenizer, "lower", True),
+            split=getattr(tokenizer, "split", " "),
+        )
+
+    def words(self, text):
+        """Same words as keras' text_to_word_sequence (bytes for ASCII text)"""
+        if isinstance(text, list):
+            # Already split (like texts_to_sequences, only lowercased)
+            return [word.lower() for word in text] if self.lower else text
+        if self.ascii and text.isascii():
+            data = text.encode()
+            if self.lower:
+                data = data.lower()
+            return [word for word in data.translate(self.byte_table).split(self.byte_split) if word]
+        if self.lower:
+            text = text.lower()
+        return [word for word in text.translate(self.table).split(self.split) if word]
+
+    def ids(self, text):
+        """Token ids of one message, as texts_to_sequences gives them"""
+        words = self.words(text)
+        get = self.byte_vocab.get if words and isinstance(words[0], bytes) else self.vocab.get
+        if self.oov_id is not None:
+            return [get(word, self.oov_id) for word in words]
+        return [i for i in map(get, words) if i is not None]
+
+    def texts_to_sequences(self, texts):
+        return [self.ids(text) for text in texts]
+
+    def _buffer(self, rows, max_len):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < rows or buffer.shape[1] != max_len:
+            buffer = self._local.buffer = np.zeros((max(rows, 64), max_len), dtype=np.int32)
+        return buffer
+
+    def encode(self, texts, max_len):
+        """(batch, lengths) for ``texts``, post-padded to ``max_len``
+
+        ``batch`` is a view of this thread's buffer: it is overwritten by
+        the thread's next encode() call, so copy it to keep it.
+        """
+        ids_of = self.ids
+        flat = []
+        lengths = []
+        for text in texts:
+            ids = ids_of(text)
+            if len(ids) > max_len:
+                ids = ids[-max_len:]
+            lengths.append(len(ids))
+            flat.extend(ids)
+        lengths = np.array(lengths, dtype=np.int32)
+
+        batch = self._buffer(len(texts), max_len)[:len(texts)]
+        batch.fill(0)
+        if flat:
+            # One scatter for the whole batch: row r gets its ids in
+            # columns 0..lengths[r]-1, in row-major order
+            batch[np.arange(max_len) < lengths[:, None]] = flat
+        return batch, lengths
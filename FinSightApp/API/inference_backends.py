@@ -0,0 +1,224 @@
+"""
+Inference backends for the spam model.
+
+The same model can be served by Keras (model_sentiment.keras), a converted
+TensorFlow Lite flatbuffer (model_sentiment.tflite) or ONNX Runtime
+(model_sentiment.onnx), chosen with SPAM_MODEL_BACKEND. Only the Keras
+backend imports TensorFlow; the other two keep startup time and RSS small
+on the free instances. export_model.py converts the Keras model and checks
+that a converted backend agrees with it.
+
+Every backend exposes predict(batch) -> np.ndarray for an int32 matrix of
+padded token ids, and input_shape / output_shape like a Keras model.
+"""
+
+import os
+import pickle
+import threading
+
+import numpy as np
+
+SPAM_MODEL_BACKEND = os.getenv("SPAM_MODEL_BACKEND", "keras")
+SPAM_MODEL_DIR = os.getenv("SPAM_MODEL_DIR", "model")
+SPAM_MODEL_THREADS = int(os.getenv("SPAM_MODEL_THREADS", "0"))  # 0 = runtime default
+
+MODEL_FILES = {
+    "keras": "model_sentiment.keras",
+    "tflite": "model_sentiment.tflite",
+    "onnx": "model_sentiment.onnx",
+}
+
+
+# =======================
+# Pickled artifacts
+# =======================
+
+def text_to_word_sequence(text, filters, lower=True, split=" "):
+    """Same splitting as keras' legacy text_to_word_sequence"""
+    if lower:
+        text = text.lower()
+    text = text.translate(str.maketrans({c: split for c in filters}))
+    return [word for word in text.split(split) if word]
+
+
+class PickledTokenizer:
+    """Stand-in for keras' legacy Tokenizer, restored from tokenizer.pkl
+
+    Lets the lightweight backends use the pickled vocabulary and config
+    without importing keras. texts_to_sequences() follows the keras
+    implementation step for step.
+    """
+
+    def texts_to_sequences(self, texts):
+        return list(self.texts_to_sequences_generator(texts))
+
+    def texts_to_sequences_generator(self, texts):
+        num_words = self.num_words
+        oov_token_index = self.word_index.get(self.oov_token)
+        for text in texts:
+            if self.char_level or isinstance(text, list):
+                if self.lower:
+                    if isinstance(text, list):
+                        text = [text_elem.lower() for text_elem in text]
+                    else:
+                        text = text.lower()
+                seq = text
+            elif getattr(self, "analyzer", None) is None:
+                seq = text_to_word_sequence(text, filters=self.filters, lower=self.lower, split=self.split)
+            else:
+                seq = self.analyzer(text)
+            vect = []
+            for w in seq:
+                i = self.word_index.get(w)
+                if i is not None:
+                    if num_words and i >= num_words:
+                        if oov_token_index is not None:
+                            vect.append(oov_token_index)
+                    else:
+                        vect.append(i)
+                elif self.oov_token is not None:
+                    vect.append(oov_token_index)
+            yield vect
+
+
+class PickledLabelEncoder:
+    """Stand-in for sklearn's LabelEncoder; only classes_ is used"""
+
+
+class _LightweightUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if name == "Tokenizer" and "keras" in module:
+            return PickledTokenizer
+        if name == "LabelEncoder" and module.startswith("sklearn"):
+            return PickledLabelEncoder
+        return super().find_class(module, name)
+
+
+def load_pickle(path, lightweight=False):
+    """Unpickle an artifact; ``lightweight`` avoids importing keras/sklearn"""
+    with open(path, "rb") as f:
+        if lightweight:
+            return _LightweightUnpickler(f).load()
+        return pickle.load(f)
+
+
+def load_artifacts(model_dir=SPAM_MODEL_DIR, lightweight=False):
+    """(tokenizer, label_encoder, max_len) from the pickled artifacts"""
+    tokenizer = load_pickle(os.path.join(model_dir, "tokenizer.pkl"), lightweight)
+    label_encoder = load_pickle(os.path.join(model_dir, "label_encoder.pkl"), lightweight)
+    max_len = load_pickle(os.path.join(model_dir, "max_len.pkl"), lightweight)
+    return tokenizer, label_encoder, max_len
+
+
+# =======================
+# Backends
+# =======================
+
+class KerasBackend:
+    name = "keras"
+    lightweight_artifacts = False
+
+    def __init__(self, path):
+        import tensorflow as tf
+        from keras.models import load_model
+
+        # Set memory growth for GPU if available
+        gpus = tf.config.experimental.list_physical_devices('GPU')
+        if gpus:
+            try:
+                for gpu in gpus:
+                    tf.config.experimental.set_memory_growth(gpu, True)
+            except RuntimeError as e:
+                print(f"GPU setup warning: {e}")
+        if SPAM_MODEL_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(SPAM_MODEL_THREADS)
+
+        self.model = load_model(path, compile=False)
+        self.input_shape = tuple(self.model.input_shape)
+        self.output_shape = tuple(self.model.output_shape)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict(batch, verbose=0))
+
+
+class TFLiteBackend:
+    name = "tflite"
+    lightweight_artifacts = True
+
+    def __init__(self, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=path, num_threads=SPAM_MODEL_THREADS or None)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        signature = self._input.get("shape_signature", self._input["shape"])
+        self.input_shape = tuple(None if d < 0 else int(d) for d in signature)
+        out_signature = self._output.get("shape_signature", self._output["shape"])
+        self.output_shape = tuple(None if d < 0 else int(d) for d in out_signature)
+        self._batch_shape = tuple(self._input["shape"])
+        # The interpreter holds tensor state, so calls must not overlap
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=self._input["dtype"])
+        with self._lock:
+            if tuple(batch.shape) != self._batch_shape:
+                self.interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_shape = tuple(batch.shape)
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output["index"]).copy()
+
+
+ONNX_DTYPES = {
+    "tensor(int32)": np.int32,
+    "tensor(int64)": np.int64,
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+}
+
+
+class OnnxBackend:
+    name = "onnx"
+    lightweight_artifacts = True
+
+    def __init__(self, path):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if SPAM_MODEL_THREADS:
+            options.intra_op_num_threads = SPAM_MODEL_THREADS
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        model_output = self.session.get_outputs()[0]
+        self._input_name = model_input.name
+        self._input_dtype = ONNX_DTYPES.get(model_input.type, np.float32)
+        self.input_shape = tuple(d if isinstance(d, int) else None for d in model_input.shape)
+        self.output_shape = tuple(d if isinstance(d, int) else None for d in model_output.shape)
+
+    def predict(self, batch):
+        feed = {self._input_name: np.asarray(batch, dtype=self._input_dtype)}
+        return self.session.run(None, feed)[0]
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "tflite": TFLiteBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def model_path(backend=SPAM_MODEL_BACKEND, model_dir=SPAM_MODEL_DIR):
+    return os.path.join(model_dir, MODEL_FILES[backend])
+
+
+def create_backend(backend=SPAM_MODEL_BACKEND, model_dir=SPAM_MODEL_DIR):
+    """Instantiate the configured backend for the model file in ``model_dir``"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown SPAM_MODEL_BACKEND {backend!r} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[backend](model_path(backend, model_dir))
@@ -0,0 +1,314 @@
+"""
+Background jobs for whole-inbox analysis.
+
+A first-run import can be tens of thousands of messages, and a synchronous
+/predict-sms or /debug-sms-analysis call for all of them runs past client
+timeouts. POST /jobs answers at once with a job id; a small local thread
+pool runs the job in chunks, recording progress after each chunk, and the
+client polls (or long-polls) GET /jobs/{id} and then fetches
+GET /jobs/{id}/result.
+
+Job state and the rendered result live in a local SQLite file, so every
+uvicorn worker on the instance can answer for any job. The messages stay
+in the memory of the worker that accepted the job. A job whose worker
+process is gone is reported as failed instead of staying "running"
+forever. Finished jobs are deleted JOBS_TTL_SECONDS after they finish.
+
+The runners themselves live in main.py and call the same parse_message,
+summary and spam scoring code as the synchronous endpoints.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from admission import AdmissionRejected
+
+JOBS_STORE_PATH = os.getenv("JOBS_STORE_PATH", "jobs.db")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "1"))
+JOBS_MAX_PENDING = int(os.getenv("JOBS_MAX_PENDING", "16"))  # queued + running, per worker process
+JOBS_MAX_MESSAGES = int(os.getenv("JOBS_MAX_MESSAGES", "200000"))
+JOBS_CHUNK_SIZE = int(os.getenv("JOBS_CHUNK_SIZE", "5000"))
+JOBS_TTL_SECONDS = float(os.getenv("JOBS_TTL_SECONDS", "3600"))
+JOBS_MODEL_WAIT_SECONDS = float(os.getenv("JOBS_MODEL_WAIT_SECONDS", "300"))
+JOBS_MAX_WAIT_SECONDS = 60  # Longest long-poll a client can ask for
+
+FINISHED = ("done", "failed")
+
+# Identifies this process; the random part tells a restarted process apart
+# from its predecessor when the pid is reused (pid 1 in a container)
+_HOST = socket.gethostname()
+OWNER = f"{_HOST}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobCancelled(Exception):
+    """The job was deleted while it was running"""
+
+
+def _owner_alive(owner):
+    host, pid, _ = owner.split(":")
+    if owner == OWNER or host != _HOST:
+        # Another host's process cannot be checked from here
+        return True
+    if int(pid) == os.getpid():
+        return False  # Our pid, but an earlier process
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """Job rows in a SQLite file shared by all workers on the instance"""
+
+    def __init__(self, path=JOBS_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        # One connection per thread; job workers and request handlers both read
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " total INTEGER NOT NULL,"
+                " processed INTEGER NOT NULL,"
+                " owner TEXT NOT NULL,"
+                " error TEXT,"
+                " result BLOB,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id, kind, total, owner=OWNER):
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, total, processed, owner, created_at, updated_at)"
+            " VALUES (?, ?, 'queued', ?, 0, ?, ?, ?)",
+            (job_id, kind, total, owner, now, now),
+        )
+
+    def set_status(self, job_id, status):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), job_id)
+        )
+
+    def set_progress(self, job_id, processed):
+        self._connect().execute(
+            "UPDATE jobs SET processed = ?, updated_at = ? WHERE id = ?", (processed, time.time(), job_id)
+        )
+
+    def finish(self, job_id, result, ttl=JOBS_TTL_SECONDS):
+        """Store the rendered result (JSON bytes) and start the TTL"""
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', processed = total, result = ?, updated_at = ?, expires_at = ?"
+            " WHERE id = ?",
+            (result, now, now + ttl, job_id),
+        )
+
+    def fail(self, job_id, error, ttl=JOBS_TTL_SECONDS):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, expires_at = ? WHERE id = ?",
+            (error, now, now + ttl, job_id),
+        )
+
+    def get(self, job_id):
+        """Job state as a dict (without the result), or None if unknown"""
+        row = self._connect().execute(
+            "SELECT id, kind, status, total, processed, owner, error, created_at, updated_at, expires_at"
+            " FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (job_id, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("job_id", "kind", "status", "total", "processed", "owner", "error",
+                "created_at", "updated_at", "expires_at")
+        return dict(zip(keys, row))
+
+    def result(self, job_id):
+        row = self._connect().execute(
+            "SELECT result FROM jobs WHERE id = ? AND status = 'done' AND expires_at > ?",
+            (job_id, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, job_id):
+        return self._connect().execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount > 0
+
+    def purge_expired(self):
+        return self._connect().execute(
+            "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+    def counts(self):
+        return dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class Job:
+    """What a runner sees: the messages, the options and a progress hook"""
+
+    def __init__(self, manager, job_id, kind, messages, options):
+        self.manager = manager
+        self.id = job_id
+        self.kind = kind
+        self.messages = messages
+        self.options = options
+        self.chunk_size = manager.chunk_size
+
+    def chunks(self):
+        """Slices of the messages, recording progress after each one"""
+        for start in range(0, len(self.messages), self.chunk_size):
+            self.check_cancelled()
+            yield self.messages[start:start + self.chunk_size]
+            self.manager.store.set_progress(self.id, min(start + self.chunk_size, len(self.messages)))
+
+    def check_cancelled(self):
+        if self.id in self.manager._cancelled:
+            raise JobCancelled(self.id)
+
+
+class JobManager:
+    """Bounded thread pool running the jobs this process accepted
+
+    ``runners`` maps a job kind to ``runner(job) -> JSON bytes``.
+    """
+
+    def __init__(self, runners, store=None, workers=JOBS_WORKERS, max_pending=JOBS_MAX_PENDING,
+                 max_messages=JOBS_MAX_MESSAGES, chunk_size=JOBS_CHUNK_SIZE, ttl=JOBS_TTL_SECONDS):
+        self.runners = runners
+        self.store = store or JobStore()
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.max_messages = max_messages
+        self.chunk_size = max(1, chunk_size)
+        self.ttl = ttl
+        self.loop = None  # The app's event loop, for runners that await async code
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._cancelled = set()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self, loop=None):
+        with self._lock:
+            if loop is not None:
+                self.loop = loop
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self.store.purge_expired()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            # Running jobs stop at their next chunk
+            self._cancelled.update(self._pending)
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit(self, kind, messages, options=None):
+        """Queue a job and return its id
+
+        Raises AdmissionRejected (429) when this process already has
+        max_pending jobs queued or running.
+        """
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        if len(messages) > self.max_messages:
+            raise ValueError(f"A job takes at most {self.max_messages} messages")
+        self.start()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.rejected += 1
+                raise AdmissionRejected(429, "Job queue is full, retry later", self.retry_after())
+            self._pending.add(job_id)
+        try:
+            self.store.create(job_id, kind, len(messages))
+            self._executor.submit(self._run, Job(self, job_id, kind, messages, options or {}))
+        except BaseException:
+            with self._lock:
+                self._pending.discard(job_id)
+            raise
+        self.store.purge_expired()
+        return job_id
+
+    def retry_after(self):
+        return 5 * max(1, len(self._pending) // self.workers)
+
+    def _run(self, job):
+        try:
+            job.check_cancelled()
+            self.store.set_status(job.id, "running")
+            result = self.runners[job.kind](job)
+            job.check_cancelled()
+            self.store.finish(job.id, result, self.ttl)
+            self.completed += 1
+        except JobCancelled:
+            self.store.delete(job.id)
+        except Exception as e:
+            print(f"❌ Job {job.id} ({job.kind}) failed: {e}")
+            self.store.fail(job.id, str(e) or type(e).__name__, self.ttl)
+            self.failed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(job.id)
+                self._cancelled.discard(job.id)
+
+    def status(self, job_id):
+        """Job state, or None if unknown or expired"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job["status"] not in FINISHED and not _owner_alive(job["owner"]):
+            self.store.fail(job_id, "The worker running this job stopped", self.ttl)
+            job = self.store.get(job_id)
+        del job["owner"]
+        job["progress"] = job["processed"] / job["total"] if job["total"] else 1.0
+        return job
+
+    def result(self, job_id):
+        return self.store.result(job_id)
+
+    def cancel(self, job_id):
+        """Delete a job; if this process runs it, it stops at the next chunk
+
+        A job run by another worker process keeps running there, but its
+        progress and result updates find no row and are dropped.
+        """
+        with self._lock:
+            if job_id in self._pending:
+                self._cancelled.add(job_id)
+        return self.store.delete(job_id)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "chunk_size": self.chunk_size,
+            "ttl_seconds": self.ttl,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "stored": self.store.counts(),
+        }
@@ -1,14 +1,87 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 from typing import List
-import pickle
-import pandas as pd
-import re
+import asyncio
+import os
+from functools import lru_cache
+from time import perf_counter
+import numpy as np
 import uvicorn
-from datetime import datetime
 
-app = FastAPI(title="FinSight Unified API - Spam & SMS Analysis")
+from sms_parser import parse_sms
+from sms_templates import SMS_TEMPLATE_CACHE_ENABLED, TemplateParser
+from summary_store import CursorMismatch, SummaryStore
+from parallel_parse import ParsePool
+from summary import SummaryAccumulator
+from sms_stream import (
+    SMS_STREAM_BATCH_SIZE,
+    SMS_STREAM_SUMMARY_EVERY,
+    IngestStreamingResponse,
+    batched,
+    ndjson_line,
+    read_ndjson,
+)
+from prediction_cache import (
+    TextNormalizer,
+    artifact_fingerprint,
+    cache_key,
+    create_prediction_cache,
+)
+from fast_tokenizer import FAST_TOKENIZER_ENABLED, TokenEngine
+from fast_json import dumps as json_dumps
+from spam_cascade import SPAM_CASCADE_ENABLED, SpamCascade
+from parsed_batch import ParsedBatch
+from jobs import FINISHED, JOBS_MAX_WAIT_SECONDS, JOBS_MODEL_WAIT_SECONDS, JobManager
+from inference_backends import MODEL_FILES, SPAM_MODEL_BACKEND, SPAM_MODEL_DIR
+from metrics import (
+    METRICS_ENABLED,
+    MODEL_BATCH_SIZE,
+    REGISTRY,
+    SPAM_FALLBACKS,
+    STAGE_ERRORS,
+    STAGE_SECONDS,
+    MetricsMiddleware,
+    TimedJSONResponse,
+    record_batch,
+    sampled_timer,
+    stage_timer,
+)
+from admission import AdmissionLimiter, AdmissionRejected
+# run_in_threadpool runs under the request's profiler when it is profiled
+from profiling import PROFILE_ENABLED, PROFILE_TOKEN, ProfileStore, ProfilingMiddleware, run_in_threadpool
+from spam_model import SPAM_MODEL_READY_TIMEOUT, SPAM_MODEL_RETRY_AFTER, SpamModel
+from batching import (
+    MicroBatcher,
+    SPAM_BATCHING_ENABLED,
+    SPAM_BATCH_MAX_SIZE,
+    SPAM_BATCH_MAX_WAIT_MS,
+)
+
+# The spam model loads in a background thread after startup (see spam_model.py);
+# SPAM_MODEL_BACKEND picks keras, tflite or onnx, only keras imports TensorFlow
+spam_model = SpamModel(SPAM_MODEL_BACKEND, SPAM_MODEL_DIR)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Serve immediately; the spam model loads and warms up in the background
+    spam_model.start()
+    asyncio.get_running_loop().run_in_executor(None, parse_pool.warmup)
+    job_manager.start(asyncio.get_running_loop())
+    yield
+    await run_in_threadpool(job_manager.shutdown)
+    parse_pool.shutdown()
+
+app = FastAPI(
+    title="FinSight Unified API - Spam & SMS Analysis",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
+)
+
+# Per-endpoint latency and status counts for /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Enable CORS (for development)
 app.add_middleware(
@@ -19,51 +92,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load artifacts at startup with error handling
-try:
-    import pickle
-    import numpy as np
-    import tensorflow as tf
-    from keras.models import load_model
-    from keras.preprocessing.sequence import pad_sequences
-    
-    # Set memory growth for GPU if available
-    gpus = tf.config.experimental.list_physical_devices('GPU')
-    if gpus:
-        try:
-            for gpu in gpus:
-                tf.config.experimental.set_memory_growth(gpu, True)
-        except RuntimeError as e:
-            print(f"GPU setup warning: {e}")
-    
-    with open('model/tokenizer.pkl', 'rb') as f:
-        tokenizer = pickle.load(f)
-
-    with open('model/label_encoder.pkl', 'rb') as f:
-        label_encoder = pickle.load(f)
-
-    with open('model/max_len.pkl', 'rb') as f:
-        max_len = pickle.load(f)
-
-    try:
-        model = load_model('model/model_sentiment.keras', compile=False)
-        print("✅ Spam detection model loaded successfully!")
-        print(f"📊 Model input shape: {model.input_shape}")
-        print(f"📊 Model output shape: {model.output_shape}")
-    except Exception as e:
-        print(f"⚠️ Warning: Could not load spam detection model: {e}")
-        print("📱 SMS financial summary will still work without spam detection.")
-        tokenizer = None
-        label_encoder = None
-        max_len = None
-        model = None
-except Exception as e:
-    print(f"⚠️ Warning: Could not load spam detection model: {e}")
-    print("📱 SMS financial summary will still work without spam detection.")
-    tokenizer = None
-    label_encoder = None
-    max_len = None
-    model = None
+# 🔬 Opt-in request profiling (see profiling.py); outermost, so the regex
+# replay after a profiled response is not counted in its latency
+profile_store = ProfileStore()
+if PROFILE_ENABLED:
+    app.add_middleware(ProfilingMiddleware, store=profile_store)
+
+# 🚦 Admission control: per-endpoint limits on messages in flight, with a
+# bounded wait queue; overload is answered with 429/503 + Retry-After
+spam_admission = AdmissionLimiter("predict-spam", capacity=512, max_queue=4096)
+sms_admission = AdmissionLimiter("predict-sms", capacity=20000, max_queue=60000)
+debug_admission = AdmissionLimiter("debug-sms-analysis", capacity=5000, max_queue=10000)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, exc):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": {"message": exc.message, "retry_after": exc.retry_after}},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Predictions are cached per (normalized text, model artifacts) pair
+MODEL_ARTIFACTS = [
+    os.path.join(SPAM_MODEL_DIR, 'tokenizer.pkl'),
+    os.path.join(SPAM_MODEL_DIR, 'label_encoder.pkl'),
+    os.path.join(SPAM_MODEL_DIR, 'max_len.pkl'),
+    os.path.join(SPAM_MODEL_DIR, MODEL_FILES.get(SPAM_MODEL_BACKEND, 'model_sentiment.keras')),
+]
+MODEL_FINGERPRINT = artifact_fingerprint(MODEL_ARTIFACTS)
+prediction_cache = create_prediction_cache()
+
+# Optional length buckets (e.g. "16,32") so short SMS are not padded to
+# max_len. Only used when the model accepts variable-length input.
+SPAM_LENGTH_BUCKETS = sorted(
+    int(width) for width in os.getenv("SPAM_LENGTH_BUCKETS", "").split(",") if width.strip()
+)
 
 # Request & Response schemas
 from typing import Union, Optional
@@ -86,12 +149,308 @@ class PredictionOut(BaseModel):
     label: str
     confidence: float
     probabilities: dict
+    stage: Optional[str] = None  # rules or model, with SPAM_CASCADE=1
 
 class BatchPredictionOut(BaseModel):
     results: List[PredictionOut]
 
-@app.post("/predict-spam")
-def predict_spam(payload: FlexibleTextIn):
+# Predictions travel as plain dicts with PredictionOut's fields: building
+# and validating a pydantic object per message cost as much as inference
+def _error_prediction():
+    return {"label": "error", "confidence": 0.0, "probabilities": {"error": 1.0}}
+
+def _unknown_prediction():
+    return {"label": "unknown", "confidence": 0.0, "probabilities": {"ham": 0.5, "spam": 0.5}}
+
+def _tokenize_batch(tokenizer, messages):
+    """Token id lists for every message, None where tokenization failed"""
+    try:
+        return tokenizer.texts_to_sequences(messages)
+    except Exception:
+        # Redo it one message at a time so a bad input only fails itself
+        sequences = []
+        for message in messages:
+            try:
+                sequences.append(tokenizer.texts_to_sequences([message])[0])
+            except Exception:
+                sequences.append(None)
+        return sequences
+
+def _pad_batch(sequences, maxlen):
+    """Post-pad token ids into one preallocated int32 matrix
+
+    Same layout as pad_sequences(padding='post'): sequences longer than
+    maxlen keep their last maxlen tokens.
+    """
+    batch = np.zeros((len(sequences), maxlen), dtype=np.int32)
+    lengths = np.zeros(len(sequences), dtype=np.int32)
+    for i, seq in enumerate(sequences):
+        if seq:
+            seq = seq[-maxlen:]
+            batch[i, :len(seq)] = seq
+            lengths[i] = len(seq)
+    return batch, lengths
+
+def _accepts_variable_length(model):
+    input_shape = getattr(model, "input_shape", None)
+    return bool(input_shape) and len(input_shape) > 1 and input_shape[1] is None
+
+def _run_model(model, batch, lengths):
+    """Forward pass, optionally split into length buckets"""
+    if not SPAM_LENGTH_BUCKETS or not _accepts_variable_length(model):
+        return model.predict(batch)
+
+    probs = None
+    remaining = np.ones(len(batch), dtype=bool)
+    for width in SPAM_LENGTH_BUCKETS + [batch.shape[1]]:
+        rows = np.flatnonzero(remaining & (lengths <= width))
+        if rows.size == 0:
+            continue
+        bucket_probs = model.predict(batch[rows, :max(width, 1)])
+        if probs is None:
+            probs = np.empty((len(batch),) + bucket_probs.shape[1:], dtype=bucket_probs.dtype)
+        probs[rows] = bucket_probs
+        remaining[rows] = False
+    return probs
+
+def _score_rows(model, batch, lengths):
+    """Model output for every row; rows the model could not score are NaN"""
+    try:
+        return _run_model(model, batch, lengths)
+    except Exception:
+        rows = []
+        for i in range(len(batch)):
+            try:
+                rows.append(np.asarray(_run_model(model, batch[i:i + 1], lengths[i:i + 1]))[0])
+            except Exception:
+                rows.append(None)
+        width = next((row.size for row in rows if row is not None), 1)
+        probs = np.full((len(batch), width), np.nan, dtype=np.float32)
+        for i, row in enumerate(rows):
+            if row is not None:
+                probs[i] = row.reshape(-1)
+        return probs
+
+@lru_cache(maxsize=1)
+def _token_engine(tokenizer):
+    return TokenEngine.from_tokenizer(tokenizer) if FAST_TOKENIZER_ENABLED else None
+
+def _encode_batch(tokenizer, messages, max_len):
+    """(ok mask, padded ids of the ok rows, lengths, time tokenizing ended)
+
+    The fast engine tokenizes and pads in one step straight into a reused
+    buffer; if it is unavailable or fails, texts_to_sequences handles the
+    batch and bad messages are masked out.
+    """
+    engine = _token_engine(tokenizer)
+    if engine is not None:
+        try:
+            batch, lengths = engine.encode(messages, max_len)
+            return np.ones(len(messages), dtype=bool), batch, lengths, perf_counter()
+        except Exception:
+            pass
+    sequences = _tokenize_batch(tokenizer, messages)
+    tokenized = perf_counter()
+    ok = np.array([seq is not None for seq in sequences], dtype=bool)
+    batch, lengths = _pad_batch([seq for seq in sequences if seq is not None], max_len)
+    return ok, batch, lengths, tokenized
+
+# Stage histograms resolved once; predict_messages runs for every micro-batch
+TOKENIZE_SECONDS = STAGE_SECONDS.labels("tokenize")
+PAD_SECONDS = STAGE_SECONDS.labels("pad")
+INFERENCE_SECONDS = STAGE_SECONDS.labels("inference")
+MODEL_BATCH_ROWS = MODEL_BATCH_SIZE.labels()
+
+def predict_messages(messages):
+    """Score a list of messages with one forward pass of the spam model"""
+    # Check if model is loaded
+    loaded = spam_model.loaded
+    if loaded is None:
+        if METRICS_ENABLED:
+            SPAM_FALLBACKS.inc(len(messages))
+        return [_unknown_prediction() for _ in messages]
+    if not messages:
+        return []
+    tokenizer, label_encoder, max_len, model = loaded
+
+    # 1. Text → one padded int32 matrix of token ids
+    started = perf_counter()
+    ok, batch, lengths, tokenized = _encode_batch(tokenizer, messages, max_len)
+    padded = perf_counter()
+
+    # 2. Model inference, one forward pass for the whole batch
+    classes = list(label_encoder.classes_)
+    probs = np.full((len(messages), 1), np.nan, dtype=np.float32)
+    if len(batch):
+        scored = _score_rows(model, batch, lengths)
+        probs = np.full((len(messages),) + scored.shape[1:], np.nan, dtype=scored.dtype)
+        probs[ok] = scored
+    probs = probs.reshape(len(messages), -1)
+    if METRICS_ENABLED:
+        TOKENIZE_SECONDS.observe(tokenized - started)
+        PAD_SECONDS.observe(padded - tokenized)
+        if len(batch):
+            INFERENCE_SECONDS.observe(perf_counter() - padded)
+            MODEL_BATCH_ROWS.observe(len(batch))
+
+    # 3. Probabilities and top label for all rows at once
+    if probs.shape[1] == 1:
+        # Binary sigmoid
+        probs = np.hstack([1 - probs, probs])
+    probs = probs[:, :len(classes)]
+    valid = np.isfinite(probs).all(axis=1)
+    top = np.argmax(np.where(np.isfinite(probs), probs, -np.inf), axis=1)
+    confidences = probs[np.arange(len(probs)), top]
+    if METRICS_ENABLED and not valid.all():
+        STAGE_ERRORS.labels("tokenize").inc(int((~ok).sum()))
+        STAGE_ERRORS.labels("inference").inc(int((ok & ~valid).sum()))
+
+    results = []
+    for row, label_idx, confidence, is_valid in zip(
+        probs.tolist(), top.tolist(), confidences.tolist(), valid.tolist()
+    ):
+        if not is_valid:
+            results.append(_error_prediction())
+            continue
+        results.append({
+            "label": classes[label_idx],
+            "confidence": confidence,
+            "probabilities": dict(zip(classes, row)),
+        })
+    return results
+
+# Concurrent /predict-spam requests are coalesced into shared forward passes
+spam_batcher = MicroBatcher(
+    predict_messages,
+    max_batch_size=SPAM_BATCH_MAX_SIZE,
+    max_wait_ms=SPAM_BATCH_MAX_WAIT_MS,
+)
+
+# Optional rule stage before the model (see spam_cascade.py)
+spam_cascade = SpamCascade() if SPAM_CASCADE_ENABLED else None
+
+@lru_cache(maxsize=1)
+def _normalizer(tokenizer):
+    return TextNormalizer(tokenizer)
+
+async def _score_uncached(messages):
+    if SPAM_BATCHING_ENABLED:
+        return await spam_batcher.submit(messages)
+    return await run_in_threadpool(predict_messages, messages)
+
+async def score_messages(messages, lowered=None):
+    """Predictions for messages, from the rule stage when it is enabled
+
+    Messages the cascade cannot decide are scored by the model; every
+    prediction then says which stage decided it ("unavailable" while the
+    model is not loaded).
+    """
+    if spam_cascade is None:
+        return await _score_with_model(messages, lowered)
+    if spam_model.loaded is None:
+        return [{**result, "stage": "unavailable"} for result in await _score_with_model(messages, lowered)]
+    results = spam_cascade.decide_many(messages, lowered)
+    rest = [i for i, result in enumerate(results) if result is None]
+    if rest:
+        scored = await _score_with_model(
+            [messages[i] for i in rest],
+            [lowered[i] for i in rest] if lowered is not None else None,
+        )
+        for i, result in zip(rest, scored):
+            # A copy: cached predictions are shared
+            results[i] = {**result, "stage": "model"}
+    return results
+
+async def _score_with_model(messages, lowered=None):
+    """Model predictions for messages; repeats are answered from the cache
+
+    Only cache misses (each distinct text once) go to the model.
+    ``lowered`` holds the messages already lowercased; the text is then
+    normalized from it and the model gets the normalized words, so it is
+    not lowercased and split a second time.
+    """
+    loaded = spam_model.loaded
+    if loaded is None or (prediction_cache is None and lowered is None):
+        return await _score_uncached(messages)
+
+    normalize_message = _normalizer(loaded.tokenizer)
+    if lowered is not None and normalize_message.lower and not normalize_message.exact:
+        normalized = [normalize_message(text, lowered=True) for text in lowered]
+        split = normalize_message.split
+        # texts_to_sequences takes a word list as already-split text
+        messages = [text.split(split) if text else [] for text in normalized]
+    else:
+        normalized = [normalize_message(message) for message in messages]
+    if prediction_cache is None:
+        return await _score_uncached(messages)
+
+    keys = [cache_key(MODEL_FINGERPRINT, text) for text in normalized]
+    results = prediction_cache.get_many(keys)
+
+    misses = {}
+    for i, result in enumerate(results):
+        if result is None:
+            misses.setdefault(keys[i], messages[i])
+    if not misses:
+        return results
+
+    scored = dict(zip(misses, await _score_uncached(list(misses.values()))))
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = scored[keys[i]]
+
+    prediction_cache.set_many([
+        (key, r)
+        for key, r in scored.items()
+        if r["label"] not in ("error", "unknown")
+    ])
+    return results
+
+async def _wait_for_model():
+    """Wait up to SPAM_MODEL_READY_TIMEOUT for a loading model, else 503"""
+    if not spam_model.pending:
+        return
+    spam_model.start()
+    deadline = asyncio.get_running_loop().time() + SPAM_MODEL_READY_TIMEOUT
+    while spam_model.pending and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.05)
+    if spam_model.pending:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "message": "Spam model is warming up, retry shortly",
+                "state": spam_model.state,
+                "retry_after": SPAM_MODEL_RETRY_AFTER,
+            },
+            headers={"Retry-After": str(SPAM_MODEL_RETRY_AFTER)},
+        )
+
+RESPONSE_FORMATS = ("default", "columnar")
+
+def _response_format(query_format, header_format):
+    response_format = (query_format or header_format or "default").lower()
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown response format {response_format!r}; expected one of {', '.join(RESPONSE_FORMATS)}",
+        )
+    return response_format
+
+@app.post("/predict-spam", response_model=Union[PredictionOut, BatchPredictionOut])
+async def predict_spam(
+    payload: FlexibleTextIn,
+    format: Optional[str] = None,
+    x_response_format: Optional[str] = Header(None),
+):
+    """Spam label, confidence and class probabilities per message
+
+    ?format=columnar (or an X-Response-Format: columnar header) returns
+    {"format": "columnar", "labels": [...], "confidences": [...]} instead
+    of one object per message. With SPAM_CASCADE=1 each prediction also
+    has a "stage" (rules, model or unavailable), and columnar output a
+    "stages" list.
+    """
+    response_format = _response_format(format, x_response_format)
     # Determine if this is a single message or batch
     # Accept both text and messages, merge if both are provided
     messages_to_process = []
@@ -101,68 +460,71 @@ def predict_spam(payload: FlexibleTextIn):
         messages_to_process.extend(payload.messages)
     return_single = len(messages_to_process) == 1
 
-    results = []
-
-    for message in messages_to_process:
-        # Check if model is loaded
-        if not all([tokenizer, label_encoder, max_len, model]):
-            results.append(PredictionOut(
-                label="unknown",
-                confidence=0.0,
-                probabilities={"ham": 0.5, "spam": 0.5}
-            ))
-            continue
-        
-        try:
-            import numpy as np
-            
-            # 1. Text → sequence → padded
-            seq = tokenizer.texts_to_sequences([message])
-            pad = pad_sequences(seq, maxlen=max_len, padding='post')
-
-            # 2. Model inference
-            probs = model.predict(pad).flatten()
-
-            # 3. Build probability dict
-            if probs.shape[0] == 1:
-                # Binary sigmoid
-                prob_dict = {
-                    label_encoder.classes_[0]: float(1 - probs[0]),
-                    label_encoder.classes_[1]: float(probs[0])
-                }
-            else:
-                # (rare) multiclass softmax
-                prob_dict = {
-                    label: float(p)
-                    for label, p in zip(label_encoder.classes_, probs)
-                }
-
-            # 4. Pick top
-            idx = int(np.argmax(list(prob_dict.values())))
-            predicted_label = label_encoder.classes_[idx]
-            confidence = list(prob_dict.values())[idx]
-
-            results.append(PredictionOut(
-                label=predicted_label,
-                confidence=confidence,
-                probabilities=prob_dict
-            ))
-        except Exception as e:
-            results.append(PredictionOut(
-                label="error",
-                confidence=0.0,
-                probabilities={"error": 1.0}
-            ))
-    
+    record_batch("/predict-spam", len(messages_to_process))
+    await _wait_for_model()
+    async with spam_admission.slot(len(messages_to_process)):
+        results = await score_messages(messages_to_process)
+
+    # Rendered directly (orjson when installed): the plain dicts skip
+    # response validation and jsonable_encoder
+    if response_format == "columnar":
+        return TimedJSONResponse({
+            "format": "columnar",
+            "labels": [result["label"] for result in results],
+            "confidences": [result["confidence"] for result in results],
+            **({"stages": [result["stage"] for result in results]} if spam_cascade is not None else {}),
+        })
     # Return single result or batch results based on input
     if return_single:
-        return results[0] if results else PredictionOut(
-            label="error",
-            confidence=0.0,
-            probabilities={"error": 1.0}
-        )
+        return TimedJSONResponse(results[0] if results else _error_prediction())
     else:
-        return BatchPredictionOut(results=results)
+        return TimedJSONResponse({"results": results})
+
+# 📈 Micro-batching statistics for /predict-spam
+@app.get("/batching-stats")
+def batching_stats():
+    """Batch sizes achieved and time requests spent queued"""
+    return spam_batcher.stats()
+
+# 🔬 Profiles of recent profiled requests
+def _check_profile_token(x_profile):
+    if PROFILE_TOKEN and x_profile != PROFILE_TOKEN:
+        raise HTTPException(status_code=403, detail="X-Profile token required")
+
+@app.get("/profiles")
+def list_profiles(x_profile: Optional[str] = Header(None)):
+    """Ids of the stored profile reports, newest first"""
+    if not PROFILE_ENABLED:
+        return {"enabled": False}
+    _check_profile_token(x_profile)
+    return {"enabled": True, "profiles": profile_store.list()}
+
+@app.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    """One profile report: hot functions and per-pattern regex timings"""
+    if not PROFILE_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    _check_profile_token(x_profile)
+    report = profile_store.load(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Unknown or rotated profile")
+    return report
+
+# 🪜 Rule stage statistics
+@app.get("/cascade-stats")
+def cascade_stats():
+    """Messages decided by the rule stage and model calls saved"""
+    if spam_cascade is None:
+        return {"enabled": False}
+    return {"enabled": True, **spam_cascade.stats()}
+
+# 🗄️ Prediction cache statistics
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss/eviction counters of the /predict-spam prediction cache"""
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "fingerprint": MODEL_FINGERPRINT, **prediction_cache.stats()}
 
 
 
@@ -176,226 +538,189 @@ def predict_spam(payload: FlexibleTextIn):
 class SMSInput(BaseModel):
     messages: List[str]
 
-def safe_float_from_match(match):
-    if match and match.group(1):
-        s = match.group(1).replace(',', '').strip()
-        if s:
-            try:
-                return float(s)
-            except ValueError:
-                return 0
-    return 0
-
 # 🧠 2. Function to extract structured info from SMS
-def parse_sms(sms):
-    sms_lower = sms.lower()
-    amount = 0
-    tx_type = 'other'
-    date = None
-    balance = None
-    
-    # More comprehensive transaction detection patterns
-    
-    # SENT/TRANSFER patterns (money going out)
-    sent_keywords = ['sent', 'transferred', 'paid', 'payment to', 'transfer to', 'sent to', 'paid to']
-    sent_patterns = [
-        r'(\d+(?:,\d{3})*)\s*rwf\s+(?:sent|transferred|paid)\s+to',
-        r'(?:sent|transferred|paid).*?(\d+(?:,\d{3})*)\s*rwf',
-        r'payment\s+of\s+(\d+(?:,\d{3})*)\s*rwf\s+to',
-        r'transfer\s+of\s+(\d+(?:,\d{3})*)\s*rwf',
-        r'you\s+have\s+sent\s+(\d+(?:,\d{3})*)\s*rwf',
-    ]
-    
-    # RECEIVED patterns (money coming in) - Enhanced with more deposit patterns
-    received_keywords = ['received', 'credited', 'deposit', 'salary', 'refund', 'deposited', 'income', 'earning']
-    received_patterns = [
-        r'received.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'(\d+(?:,\d{3})*)\s*rwf.*?received',
-        r'credited.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'deposit.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'deposited.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'(\d+(?:,\d{3})*)\s*rwf.*?deposited',
-        r'(\d+(?:,\d{3})*)\s*rwf.*?deposit',
-        r'you\s+have\s+received\s+(\d+(?:,\d{3})*)\s*rwf',
-        r'payment.*?(\d+(?:,\d{3})*)\s*rwf.*?from',
-        r'income.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'earning.*?(\d+(?:,\d{3})*)\s*rwf',
-    ]
-    
-    # WITHDRAWAL patterns
-    withdraw_patterns = [
-        r'withdrawn.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'(\d+(?:,\d{3})*)\s*rwf.*?withdrawn',
-        r'withdraw.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'cash.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'atm.*?(\d+(?:,\d{3})*)\s*rwf',
-    ]
-    
-    # AIRTIME/BUNDLE patterns
-    airtime_patterns = [
-        r'airtime.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'bundle.*?(\d+(?:,\d{3})*)\s*rwf',
-        r'(\d+(?:,\d{3})*)\s*rwf.*?airtime',
-        r'(\d+(?:,\d{3})*)\s*rwf.*?bundle',
-        r'bought.*?(\d+(?:,\d{3})*)\s*rwf.*?(?:airtime|bundle)',
-    ]
-    
-    # Check for SENT transactions first
-    if any(keyword in sms_lower for keyword in sent_keywords):
-        for pattern in sent_patterns:
-            match = re.search(pattern, sms_lower)
-            if match:
-                tx_type = 'sent'
-                amount = safe_float_from_match(match)
-                break
-    
-    # Check for RECEIVED transactions
-    if tx_type == 'other' and any(keyword in sms_lower for keyword in received_keywords):
-        for pattern in received_patterns:
-            match = re.search(pattern, sms_lower)
-            if match:
-                tx_type = 'received'
-                amount = safe_float_from_match(match)
-                break
-    
-    # Check for WITHDRAWAL
-    if tx_type == 'other' and ('withdraw' in sms_lower or 'atm' in sms_lower or 'cash' in sms_lower):
-        for pattern in withdraw_patterns:
-            match = re.search(pattern, sms_lower)
-            if match:
-                tx_type = 'withdrawn'
-                amount = safe_float_from_match(match)
-                break
-    
-    # Check for AIRTIME purchase
-    if tx_type == 'other' and ('airtime' in sms_lower or 'bundle' in sms_lower):
-        for pattern in airtime_patterns:
-            match = re.search(pattern, sms_lower)
-            if match:
-                tx_type = 'airtime'
-                amount = safe_float_from_match(match)
-                break
-    
-    # If still no specific type found but contains transaction indicators, try to get amount
-    transaction_indicators = ['rwf', 'transaction', 'payment', 'balance', 'account']
-    if tx_type == 'other' and any(indicator in sms_lower for indicator in transaction_indicators):
-        # Try to extract any RWF amount
-        general_amount_match = re.search(r'(\d+(?:,\d{3})*)\s*rwf', sms_lower)
-        if general_amount_match:
-            amount = safe_float_from_match(general_amount_match)
-            # Try to infer transaction type from context
-            if any(word in sms_lower for word in ['to', 'paid', 'sent']):
-                tx_type = 'sent'
-            elif any(word in sms_lower for word in ['from', 'received', 'credited', 'deposit', 'deposited', 'income', 'earning']):
-                tx_type = 'received'
-            else:
-                tx_type = 'transaction'  # Generic transaction type
-    
-    # Enhanced date parsing for multiple formats
-    date_patterns = [
-        r'at\s+(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})',  # "at 2025-07-05 17:12:24"
-        r'on\s+(\d{4}-\d{2}-\d{2})',                        # "on 2025-07-05"
-        r'on\s+(\d{1,2}\s+\w+\s+\d{4})',                   # "on 5 July 2025"
-        r'(\d{4}-\d{2}-\d{2})',                             # "2025-07-05"
-        r'(\d{1,2}/\d{1,2}/\d{4})',                         # "05/07/2025"
-    ]
-    
-    for pattern in date_patterns:
-        date_match = re.search(pattern, sms)
-        if date_match:
-            try:
-                date_str = date_match.group(1)
-                if ' ' in date_str and ':' in date_str:
-                    # Format: "2025-07-05 17:12:24"
-                    date = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-                elif len(date_str) == 10 and '-' in date_str:
-                    # Format: "2025-07-05"
-                    date = datetime.strptime(date_str, '%Y-%m-%d')
-                elif '/' in date_str:
-                    # Format: "05/07/2025"
-                    date = datetime.strptime(date_str, '%d/%m/%Y')
-                else:
-                    # Format: "5 July 2025"
-                    date = datetime.strptime(date_str, '%d %B %Y')
-                break
-            except ValueError:
-                continue
-    
-    # Enhanced balance extraction - try multiple patterns
-    balance_patterns = [
-        r'new\s+balance[:\s]*(\d+(?:,\d{3})*)\s*rwf',       # "New balance: 179524 RWF"
-        r'balance[:\s]*(\d+(?:,\d{3})*)\s*rwf',             # "Balance: 179524 RWF"
-        r'current\s+balance[:\s]*(\d+(?:,\d{3})*)\s*rwf',   # "Current balance: 179524 RWF"
-        r'your\s+balance\s+is\s+(\d+(?:,\d{3})*)\s*rwf',    # "Your balance is 179524 RWF"
-        r'balance\s+is\s+now\s+(\d+(?:,\d{3})*)\s*rwf',     # "Balance is now 179524 RWF"
-        r'remaining\s+balance[:\s]*(\d+(?:,\d{3})*)\s*rwf', # "Remaining balance: 179524 RWF"
-    ]
-    
-    for pattern in balance_patterns:
-        balance_match = re.search(pattern, sms_lower)
-        if balance_match:
-            balance = safe_float_from_match(balance_match)
-            break
-
-    return {
-        "type": tx_type,
-        "amount": amount,
-        "date": date.strftime('%Y-%m-%d') if date else None,  # Ensure JSON serializable
-        "balance": balance
-    }
+# parse_sms lives in sms_parser.py: the rules are compiled once at import
+# and a keyword sweep decides which rule families are tried.
+# Repeat operator templates are answered from learned parse plans.
+template_parser = TemplateParser() if SMS_TEMPLATE_CACHE_ENABLED else None
+parse_message = template_parser.parse if template_parser else parse_sms
+# 1 in METRICS_PARSE_SAMPLE calls is timed for the parse_sms latency histogram
+parse_message = sampled_timer(parse_message, "parse_sms")
+
+# Large batches are parsed in chunks by a process pool (parallel_parse.py);
+# smaller ones inline with parse_message
+parse_pool = ParsePool()
 
 # 📊 3. Function to summarize transactions
 def summarize(sms_list):
-    records = [parse_sms(s) for s in sms_list]
-    df = pd.DataFrame(records)
+    with stage_timer("summarize"):
+        return parse_pool.accumulate(sms_list, parse_message).summary()
 
-    # Convert 'date' column to datetime, coerce errors, handle None
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    else:
-        df['date'] = pd.NaT
+# 🚀 4. API Endpoint
+@app.post("/predict-sms")
+async def predict_sms(data: SMSInput):
+    record_batch("/predict-sms", len(data.messages))
+    async with sms_admission.slot(len(data.messages)):
+        return await run_in_threadpool(summarize, data.messages)
+
+# 🔁 Incremental summary: the server keeps each device's running totals,
+# so the app only uploads messages added since its last cursor
+class IncrementalSMSInput(BaseModel):
+    device_id: str
+    messages: List[str]
+    cursor: str  # Client cursor for the newest message included in this upload
+    since_cursor: Optional[str] = None  # Cursor returned by the previous call (None the first time)
+    reset: bool = False  # Drop stored state and start over from these messages
 
-    # Filter out records with 0 amount or 'other' type to get actual transactions
-    transaction_df = df[(df['amount'] > 0) & (df['type'] != 'other')]
-    
-    # Get latest balance from the most recent transaction (by date, then by position)
-    latest_balance = None
-    if not df['balance'].dropna().empty:
-        # Sort by date (most recent first), then by original index
-        df_with_balance = df[df['balance'].notna()].copy()
-        if not df_with_balance['date'].isnull().all():
-            df_with_balance = df_with_balance.sort_values(['date'], ascending=False, na_position='last')
-        latest_balance = float(df_with_balance['balance'].iloc[0])
-
-    # Count all messages that have any transaction-related content (not just those with amounts)
-    transaction_count = len(df)  # Count all processed messages as potential transactions
-    
-    # Count only messages with actual amounts for financial totals
-    amount_transaction_count = len(transaction_df)
-
-    # Calculate monthly breakdown for sent + payment (airtime) only
-    sent_and_payment_df = transaction_df[transaction_df['type'].isin(['sent', 'airtime'])]
-    monthly_sent_payment = {}
-    if not sent_and_payment_df.empty and not sent_and_payment_df['date'].isnull().all():
-        monthly_sent_payment = sent_and_payment_df.groupby(sent_and_payment_df['date'].dt.strftime('%B %Y'))['amount'].sum().to_dict()
-
-    summary = {
-        "total_sent": float(transaction_df[transaction_df['type'] == 'sent']['amount'].sum()),
-        "total_received": float(transaction_df[transaction_df['type'] == 'received']['amount'].sum()),
-        "total_withdrawn": float(transaction_df[transaction_df['type'] == 'withdrawn']['amount'].sum()),
-        "total_airtime": float(transaction_df[transaction_df['type'] == 'airtime']['amount'].sum()),
-        "latest_balance": latest_balance,
-        "transactions_count": transaction_count,  # All messages processed
-        "amount_transactions_count": amount_transaction_count,  # Only messages with amounts
-        "monthly_summary": monthly_sent_payment  # Only sent + payment amounts
+summary_store = SummaryStore()
+
+@app.post("/predict-sms/incremental")
+async def predict_sms_incremental(data: IncrementalSMSInput):
+    """Fold new messages into the device's stored summary and return it"""
+    record_batch("/predict-sms/incremental", len(data.messages))
+    async with sms_admission.slot(len(data.messages)):
+        return await run_in_threadpool(_apply_incremental, data)
+
+def _apply_incremental(data):
+    new_records = parse_pool.accumulate(data.messages, parse_message)
+
+    try:
+        state = summary_store.apply(
+            data.device_id, data.since_cursor, data.cursor, new_records, reset=data.reset
+        )
+    except CursorMismatch as e:
+        # The client must resend everything after the stored cursor (or reset)
+        raise HTTPException(status_code=409, detail={
+            "message": "since_cursor does not match the stored cursor",
+            "cursor": e.stored_cursor,
+        })
+
+    return {
+        **state.summary(),
+        "device_id": data.device_id,
+        "cursor": data.cursor,
+        "new_messages": len(data.messages),
     }
 
-    return summary
+# 🌊 Streaming NDJSON ingestion for whole-inbox imports (see sms_stream.py)
+@app.post("/predict-sms/stream")
+async def predict_sms_stream(request: Request, spam: bool = True):
+    """Parse (and spam-score) newline-delimited messages as they arrive
+
+    Streams back one NDJSON result per message, a running summary every
+    SMS_STREAM_SUMMARY_EVERY messages and a final summary. Each batch takes
+    its own admission slots; a rejected batch ends the stream with an
+    error line carrying the 429/503 status and retry_after.
+    """
+    if spam:
+        await _wait_for_model()
+    return IngestStreamingResponse(_stream_sms(request.stream(), spam), media_type="application/x-ndjson")
+
+async def _stream_sms(chunks, spam):
+    accumulator = SummaryAccumulator()
+    next_snapshot = SMS_STREAM_SUMMARY_EVERY
+    async for batch in batched(read_ndjson(chunks), SMS_STREAM_BATCH_SIZE):
+        messages = [message for _, message, _, error in batch if error is None]
+        record_batch("/predict-sms/stream", len(messages))
+        try:
+            async with sms_admission.slot(len(messages)):
+                parsed = iter(await run_in_threadpool(lambda: [parse_message(sms) for sms in messages]))
+                scores = iter(())
+                if spam and messages:
+                    async with spam_admission.slot(len(messages)):
+                        scores = iter(await score_messages(messages))
+        except AdmissionRejected as exc:
+            # The 200 is already sent: the rejection ends the stream instead,
+            # and the client resends from the reported line on
+            yield ndjson_line({
+                "type": "error", "line": batch[0][0], "status": exc.status_code,
+                "message": exc.message, "retry_after": exc.retry_after,
+            })
+            return
+
+        lines = []
+        for line_number, _, message_id, error in batch:
+            if error is not None:
+                lines.append(ndjson_line({"type": "error", "line": line_number, "message": error}))
+                continue
+            record = next(parsed)
+            accumulator.add(record)
+            result = {"type": "result", "line": line_number, "id": message_id, "parsed": record}
+            if spam:
+                result["spam"] = next(scores)
+            lines.append(ndjson_line(result))
+
+        if SMS_STREAM_SUMMARY_EVERY and accumulator.transactions_count >= next_snapshot:
+            next_snapshot = accumulator.transactions_count + SMS_STREAM_SUMMARY_EVERY
+            lines.append(ndjson_line({
+                "type": "summary", "final": False,
+                "processed": accumulator.transactions_count, **accumulator.summary(),
+            }))
+        yield "".join(lines)
+
+    yield ndjson_line({
+        "type": "summary", "final": True,
+        "processed": accumulator.transactions_count, **accumulator.summary(),
+    })
+
+# 🔗 Fused analysis: spam scores, parsed fields and the summary in one request
+class AnalyzeInput(BaseModel):
+    messages: List[str]
+    spam: bool = True  # Score the messages with the spam model
+    exclude_spam: bool = False  # Leave spam-labelled messages out of the summary
+
+@app.post("/analyze")
+async def analyze(data: AnalyzeInput):
+    """Spam label, parsed fields and the summary for one list of messages
+
+    Replaces calling /predict-spam and /predict-sms with the same texts:
+    each message is uploaded, decoded and lowercased once, and the parser
+    and the spam normalizer share the lowercased text.
+    """
+    messages = data.messages
+    record_batch("/analyze", len(messages))
+    if data.spam:
+        await _wait_for_model()
+    async with sms_admission.slot(len(messages)):
+        lowered, parsed = await run_in_threadpool(_parse_lowered, messages)
+        scores = None
+        if data.spam:
+            async with spam_admission.slot(len(messages)):
+                scores = await score_messages(messages, lowered)
+        return await run_in_threadpool(
+            lambda: TimedJSONResponse(_analysis_body(parsed, scores, data.exclude_spam))
+        )
 
-# 🚀 4. API Endpoint
-@app.post("/predict-sms")
-def predict_sms(data: SMSInput):
-    return summarize(data.messages)
+def _parse_lowered(messages):
+    """(lowercased messages, parsed records)"""
+    lowered = [message.lower() for message in messages]
+    if parse_pool.use_for(len(messages)):
+        return lowered, parse_pool.parse(messages, parse_message)
+    return lowered, [parse_message(sms, sms_lower) for sms, sms_lower in zip(messages, lowered)]
+
+def _analysis_body(parsed, scores, exclude_spam):
+    # The body is plain JSON types already: /analyze renders it off the
+    # event loop instead of through FastAPI's recursive jsonable_encoder
+    accumulator = SummaryAccumulator()
+    results = []
+    spam_count = 0
+    for i, record in enumerate(parsed):
+        result = {"parsed": record}
+        is_spam = False
+        if scores is not None:
+            score = scores[i]
+            result["spam"] = {"label": score["label"], "confidence": score["confidence"]}
+            is_spam = score["label"] == "spam"
+            spam_count += is_spam
+        if not (exclude_spam and is_spam):
+            accumulator.add(record)
+        results.append(result)
+    return {
+        "results": results,
+        "summary": accumulator.summary(),
+        "spam_count": spam_count,
+        "excluded_from_summary": spam_count if exclude_spam else 0,
+    }
 
 # 🧪 Test endpoint for single SMS parsing
 @app.post("/test-sms")
@@ -410,47 +735,246 @@ def test_sms_parsing(message: dict):
 
 # 🧪 Debug endpoint for SMS parsing analysis
 @app.post("/debug-sms-analysis")
-def debug_sms_analysis(data: SMSInput):
+async def debug_sms_analysis(data: SMSInput):
     """Debug endpoint to analyze how SMS messages are being categorized"""
-    sms_list = data.messages
+    record_batch("/debug-sms-analysis", len(data.messages))
+    async with debug_admission.slot(len(data.messages)):
+        return await run_in_threadpool(_debug_sms_analysis, data.messages)
+
+def _debug_sms_analysis(sms_list):
+    # One parse into columns feeds the listing, the summary and every count
+    return _debug_report(sms_list, parse_pool.parse_batch(sms_list, parse_message))
+
+def _debug_report(sms_list, batch):
+    summary = batch.summary()
+
     analysis_results = []
-    
-    for i, sms in enumerate(sms_list):
-        parsed = parse_sms(sms)
+    for i, (sms, (tx_type, amount, date, balance)) in enumerate(zip(sms_list, batch.records())):
         analysis_results.append({
             "message_number": i + 1,
             "original_sms": sms[:100] + "..." if len(sms) > 100 else sms,  # Truncate for readability
-            "parsed_type": parsed['type'],
-            "parsed_amount": parsed['amount'],
-            "parsed_date": parsed['date'],
-            "parsed_balance": parsed['balance']
+            "parsed_type": tx_type,
+            "parsed_amount": amount,
+            "parsed_date": date,
+            "parsed_balance": balance
         })
-    
-    # Generate summary with detailed breakdown
-    summary = summarize(sms_list)
-    
-    # Count transactions by type
-    type_counts = {}
-    for result in analysis_results:
-        tx_type = result['parsed_type']
-        if tx_type not in type_counts:
-            type_counts[tx_type] = {'count': 0, 'total_amount': 0}
-        type_counts[tx_type]['count'] += 1
-        if result['parsed_amount'] > 0:
-            type_counts[tx_type]['total_amount'] += result['parsed_amount']
-    
+
     return {
         "total_messages": len(sms_list),
         "summary": summary,
-        "type_breakdown": type_counts,
+        "type_breakdown": batch.type_breakdown(),  # Count and amount total by type
         "detailed_analysis": analysis_results,
         "potential_issues": {
-            "messages_without_amounts": len([r for r in analysis_results if r['parsed_amount'] == 0]),
-            "messages_categorized_as_other": len([r for r in analysis_results if r['parsed_type'] == 'other']),
+            "messages_without_amounts": batch.count_without_amount(),
+            "messages_categorized_as_other": batch.count_type('other'),
             "sent_vs_received_ratio": (summary.get('total_sent', 0) / max(summary.get('total_received', 1), 1))
         }
     }
 
+# 🗂️ Background jobs for whole-inbox analysis (see jobs.py): submit the
+# messages, poll the job, fetch the result. Each kind's result is the body
+# its synchronous endpoint would return for the same messages.
+def _summary_job(job):
+    accumulator = SummaryAccumulator()
+    for chunk in job.chunks():
+        accumulator.merge(parse_pool.accumulate(chunk, parse_message))
+    return json_dumps(accumulator.summary())
+
+def _analyze_job(job):
+    spam = job.options.get("spam", True)
+    if spam:
+        spam_model.start()
+        if not spam_model.wait(JOBS_MODEL_WAIT_SECONDS):
+            raise RuntimeError(f"Spam model is not available (state: {spam_model.state})")
+    parsed = []
+    scores = [] if spam else None
+    for chunk in job.chunks():
+        lowered, records = _parse_lowered(chunk)
+        parsed.extend(records)
+        if spam:
+            # Scored on the event loop, through the same cache and batcher
+            scoring = asyncio.run_coroutine_threadsafe(score_messages(chunk, lowered), job.manager.loop)
+            scores.extend(scoring.result())
+    return json_dumps(_analysis_body(parsed, scores, job.options.get("exclude_spam", False)))
+
+def _debug_job(job):
+    batches = [parse_pool.parse_batch(chunk, parse_message) for chunk in job.chunks()]
+    return json_dumps(_debug_report(job.messages, ParsedBatch.concat(batches)))
+
+JOB_RUNNERS = {
+    "summary": _summary_job,  # /predict-sms
+    "analyze": _analyze_job,  # /analyze
+    "debug": _debug_job,  # /debug-sms-analysis
+}
+job_manager = JobManager(JOB_RUNNERS)
+
+class JobInput(BaseModel):
+    messages: List[str]
+    kind: str = "summary"  # summary, analyze or debug
+    spam: bool = True  # analyze: score the messages with the spam model
+    exclude_spam: bool = False  # analyze: leave spam out of the summary
+
+    @validator('kind')
+    def check_kind(cls, v):
+        if v not in JOB_RUNNERS:
+            raise ValueError(f"kind must be one of {', '.join(JOB_RUNNERS)}")
+        return v
+
+def _job_links(job_id):
+    return {"status_url": f"/jobs/{job_id}", "result_url": f"/jobs/{job_id}/result"}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(data: JobInput):
+    """Queue messages for background analysis and return the job id"""
+    if len(data.messages) > job_manager.max_messages:
+        raise HTTPException(status_code=413, detail=f"A job takes at most {job_manager.max_messages} messages")
+    record_batch("/jobs", len(data.messages))
+    options = {"spam": data.spam, "exclude_spam": data.exclude_spam}
+    job_id = await run_in_threadpool(job_manager.submit, data.kind, data.messages, options)
+    return {"job_id": job_id, "kind": data.kind, "status": "queued", "total": len(data.messages), **_job_links(job_id)}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, wait: float = 0):
+    """Job status and progress
+
+    With ``wait`` (seconds, up to JOBS_MAX_WAIT_SECONDS) the call returns
+    as soon as the status or progress changes, or when the wait runs out.
+    """
+    job = await run_in_threadpool(job_manager.status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    deadline = perf_counter() + min(max(wait, 0), JOBS_MAX_WAIT_SECONDS)
+    seen = (job["status"], job["processed"])
+    while job["status"] not in FINISHED and perf_counter() < deadline:
+        await asyncio.sleep(0.25)
+        job = await run_in_threadpool(job_manager.status, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired job")
+        if (job["status"], job["processed"]) != seen:
+            break
+    return {**job, **_job_links(job_id)}
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """The finished job's result; 409 while it is queued or running"""
+    result = await run_in_threadpool(job_manager.result, job_id)
+    if result is not None:
+        # Stored already rendered
+        return Response(content=result, media_type="application/json")
+    job = await run_in_threadpool(job_manager.status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    raise HTTPException(status_code=409, detail={
+        "message": f"Job is {job['status']}",
+        "status": job["status"],
+        "error": job["error"],
+    })
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Cancel a queued or running job, or drop a finished one"""
+    if not await run_in_threadpool(job_manager.cancel, job_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return {"job_id": job_id, "deleted": True}
+
+@app.get("/job-stats")
+def job_stats():
+    """Worker pool usage and stored jobs by status"""
+    return job_manager.stats()
+
+# 🧩 SMS template fast path statistics and verification
+@app.get("/template-stats")
+def template_stats():
+    """Hit/miss counts of the learned SMS template cache"""
+    if template_parser is None:
+        return {"enabled": False}
+    return {"enabled": True, **template_parser.stats()}
+
+@app.post("/debug-template-verify")
+def debug_template_verify(data: SMSInput):
+    """Compare the template fast path with the full parser on these messages"""
+    if template_parser is None:
+        return {"enabled": False}
+    return {"enabled": True, **template_parser.verify(data.messages)}
+
+# 🚦 Admission control statistics
+@app.get("/admission-stats")
+def admission_stats():
+    """Queue depth, in-flight messages and rejections per endpoint"""
+    return {
+        limiter.name: limiter.stats()
+        for limiter in (spam_admission, sms_admission, debug_admission)
+    }
+
+# ⚙️ Process-pool parsing statistics
+@app.get("/parse-pool-stats")
+def parse_pool_stats():
+    """Configuration and usage of the parallel SMS parsing pool"""
+    return parse_pool.stats()
+
+# 📈 Prometheus metrics
+def _collect_gauges():
+    admission = [spam_admission, sms_admission, debug_admission]
+    gauges = [
+        ("finsight_admission_in_flight_messages", "Messages currently admitted",
+         {(l.name,): l.in_flight for l in admission}, ("endpoint",)),
+        ("finsight_admission_queued_messages", "Messages waiting for admission",
+         {(l.name,): l.queued_weight for l in admission}, ("endpoint",)),
+        ("finsight_spam_model_ready", "1 once the spam model is loaded and warmed up",
+         {(): int(spam_model.ready)}, ()),
+    ]
+    if prediction_cache is not None:
+        gauges.append(("finsight_prediction_cache_size", "Predictions held in the cache",
+                       {(): prediction_cache.stats()["size"]}, ()))
+    if template_parser is not None:
+        gauges.append(("finsight_sms_templates", "Learned SMS templates",
+                       {(): template_parser.stats()["templates"]}, ()))
+    return gauges
+
+def _collect_counters():
+    admission = [spam_admission, sms_admission, debug_admission]
+    counters = [
+        ("finsight_admission_rejected_total", "Requests rejected by admission control",
+         {(l.name, reason): count for l in admission
+          for reason, count in (("queue_full", l.rejected_queue_full), ("timeout", l.rejected_timeout))},
+         ("endpoint", "reason")),
+    ]
+    if prediction_cache is not None:
+        cache = prediction_cache.stats()
+        counters.append(("finsight_prediction_cache_total", "Prediction cache hits, misses and evictions",
+                         {(key,): cache[key] for key in ("hits", "misses", "evictions")}, ("event",)))
+    if spam_cascade is not None:
+        counters.append(("finsight_spam_cascade_messages_total", "Messages per deciding stage of the spam cascade",
+                         {("rules", label): count for label, count in spam_cascade.decided.items()}
+                         | {("model", ""): spam_cascade.passed}, ("stage", "label")))
+    if template_parser is not None:
+        templates = template_parser.stats()
+        counters.append(("finsight_sms_templates_total", "SMS template cache hits, misses and mismatches",
+                         {(key,): templates[key] for key in ("hits", "misses", "mismatches")}, ("event",)))
+    return counters
+
+REGISTRY.add_collector(_collect_gauges)
+REGISTRY.add_collector(_collect_counters, kind="counter")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of stage timings, batch sizes and counters"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# 🩺 Liveness and readiness
+@app.get("/healthz")
+def healthz():
+    """Process is up; does not depend on the spam model"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """200 once the spam model is loaded and warmed up, 503 before"""
+    status = spam_model.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
 # 🔧 Optional: testing endpoint
 @app.get("/")
 def read_root():
@@ -0,0 +1,301 @@
+"""
+Prometheus text-format metrics without extra dependencies.
+
+Counters and histograms are plain Python objects; a label set resolves to
+a child once (``.labels(...)``) and later updates are a bisect plus two
+additions. Updates take no lock: under the GIL they cannot interleave
+mid-statement in practice, and an occasional lost increment is an
+acceptable price for monitoring (a lock costs more than the update).
+GET /metrics renders everything in the Prometheus exposition format, plus
+gauges and counters pulled from the existing stats objects (cache,
+admission, batching) at scrape time.
+
+Per-message parse_sms latency is sampled (1 in METRICS_PARSE_SAMPLE
+calls); all other stages are timed once per batch. bench_metrics.py
+measures the overhead of the instrumented hot paths.
+"""
+
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from fast_json import FastJSONResponse
+
+METRICS_ENABLED = os.getenv("METRICS", "1") != "0"
+METRICS_PARSE_SAMPLE = max(1, int(os.getenv("METRICS_PARSE_SAMPLE", "64")))
+
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "started")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child):
+        counts = list(child.counts)
+        total = child.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, ("le", _format_value(bound)))
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}_sum{labels} {_format_value(total)}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect, kind="gauge"):
+        """``collect()`` returns (name, help, {label tuple: value}, labelnames) tuples
+
+        Use kind="counter" for running totals (and end their names in _total).
+        """
+        self._collectors.append((collect, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect, kind in self._collectors:
+            for name, documentation, samples, labelnames in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for values, value in sorted(samples.items()):
+                    lines.append(f"{name}{_format_labels(labelnames, values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "finsight_stage_seconds",
+    "Time spent per processing stage (parse_sms is per message and sampled, the rest per batch)",
+    ("stage",),
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "finsight_stage_errors_total", "Messages or calls that failed, by stage", ("stage",),
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "finsight_request_seconds", "HTTP request latency by endpoint", ("endpoint", "method"),
+))
+REQUESTS = REGISTRY.register(Counter(
+    "finsight_requests_total", "HTTP requests by endpoint and status", ("endpoint", "method", "status"),
+))
+MESSAGES = REGISTRY.register(Counter(
+    "finsight_messages_total", "Messages processed by endpoint (rate() gives messages/sec)", ("endpoint",),
+))
+REQUEST_BATCH_SIZE = REGISTRY.register(Histogram(
+    "finsight_request_batch_size", "Messages per request by endpoint", ("endpoint",), buckets=BATCH_BUCKETS,
+))
+MODEL_BATCH_SIZE = REGISTRY.register(Histogram(
+    "finsight_model_batch_size", "Rows per spam model forward pass", buckets=BATCH_BUCKETS,
+))
+SPAM_FALLBACKS = REGISTRY.register(Counter(
+    "finsight_spam_unavailable_total", "Messages answered label=unknown because the model was unavailable",
+))
+
+
+def record_batch(endpoint, count):
+    """Count ``count`` messages handled by ``endpoint``"""
+    if METRICS_ENABLED:
+        MESSAGES.labels(endpoint).inc(count)
+        REQUEST_BATCH_SIZE.labels(endpoint).observe(count)
+
+
+def stage_timer(stage):
+    """Context manager timing one ``stage`` batch (no-op when metrics are off)"""
+    if METRICS_ENABLED:
+        return STAGE_SECONDS.labels(stage).time()
+    return _NULL_TIMER
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def sampled_timer(func, stage, every=METRICS_PARSE_SAMPLE):
+    """Wrap a per-message function so 1 call in ``every`` is timed"""
+    if not METRICS_ENABLED:
+        return func
+    child = STAGE_SECONDS.labels(stage)
+    counter = itertools.count()
+    perf_counter = time.perf_counter
+
+    def timed(*args):
+        if next(counter) % every:
+            return func(*args)
+        started = perf_counter()
+        result = func(*args)
+        child.observe(perf_counter() - started)
+        return result
+
+    timed.__wrapped__ = func
+    return timed
+
+
+class TimedJSONResponse(FastJSONResponse):
+    """FastJSONResponse that records its render time as the serialize stage"""
+
+    def render(self, content):
+        with stage_timer("serialize"):
+            return super().render(content)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per matched route
+
+    Requests are labelled with the route's path template (/jobs/{job_id},
+    not the id), which the router leaves in the scope once it matched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Unmatched paths share one label so scanners cannot blow up cardinality
+            endpoint = getattr(scope.get("route"), "path", None) or "other"
+            REQUEST_SECONDS.labels(endpoint, method).observe(time.perf_counter() - started)
+            REQUESTS.labels(endpoint, method, str(status[0])).inc()
@@ -0,0 +1,184 @@
+"""
+Process-pool parsing for large SMS batches.
+
+parse_sms is pure Python, so a 20k-message inbox import keeps one core
+(and the GIL) busy for seconds. ParsePool splits large message lists into
+chunks and parses them in a persistent pool of worker processes. Each
+worker returns the parsed records, a columnar ParsedBatch or a
+SummaryAccumulator for its chunk; results are combined in the original
+message order, so the output is the same as parsing inline (accumulator
+totals are summed per chunk, which is exact for whole-RWF amounts below
+2**53).
+
+Below SMS_PARSE_PARALLEL_THRESHOLD messages the chunks are not worth the
+pickling and IPC, and parsing stays inline. bench_parallel_parse.py
+measures where the crossover is on a given machine.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from parsed_batch import ParsedBatch
+from sms_parser import parse_sms
+from sms_templates import SMS_TEMPLATE_CACHE_ENABLED, TemplateParser
+from summary import SummaryAccumulator
+
+
+def _default_workers():
+    return min(os.cpu_count() or 1, 4)
+
+
+# 0 or 1 worker disables the pool
+SMS_PARSE_WORKERS = int(os.getenv("SMS_PARSE_WORKERS", "") or _default_workers())
+SMS_PARSE_PARALLEL_THRESHOLD = int(os.getenv("SMS_PARSE_PARALLEL_THRESHOLD", "5000"))
+SMS_PARSE_CHUNK_SIZE = int(os.getenv("SMS_PARSE_CHUNK_SIZE", "2000"))
+
+# Worker-side parser; every worker learns its own SMS templates
+_worker_parse = parse_sms
+
+
+def _init_worker(use_templates):
+    global _worker_parse
+    _worker_parse = TemplateParser().parse if use_templates else parse_sms
+
+
+def _parse_chunk(messages):
+    parse = _worker_parse
+    return [parse(sms) for sms in messages]
+
+
+def _batch_chunk(messages):
+    return ParsedBatch.parse(messages, _worker_parse)
+
+
+def _accumulate_chunk(messages):
+    parse = _worker_parse
+    accumulator = SummaryAccumulator()
+    for sms in messages:
+        accumulator.add(parse(sms))
+    return accumulator
+
+
+def _start_method():
+    # Forking a process that already runs threads (uvicorn's thread pool,
+    # TensorFlow) can deadlock the child; prefer a clean interpreter.
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+class ParsePool:
+    def __init__(self, workers=SMS_PARSE_WORKERS, threshold=SMS_PARSE_PARALLEL_THRESHOLD,
+                 chunk_size=SMS_PARSE_CHUNK_SIZE, use_templates=SMS_TEMPLATE_CACHE_ENABLED):
+        self.workers = max(0, int(workers))
+        self.threshold = max(1, int(threshold))
+        self.chunk_size = max(1, int(chunk_size))
+        self.use_templates = use_templates
+        self._executor = None
+        self._lock = threading.Lock()
+        self.parallel_calls = 0
+        self.parallel_messages = 0
+        self.chunks = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self):
+        return self.workers > 1
+
+    def use_for(self, count):
+        """True if ``count`` messages should be parsed in the pool"""
+        return self.enabled and count >= self.threshold
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(_start_method()),
+                    initializer=_init_worker,
+                    initargs=(self.use_templates,),
+                )
+            return self._executor
+
+    def _chunks(self, messages):
+        # At least one chunk per worker, at most chunk_size messages each
+        size = min(self.chunk_size, math.ceil(len(messages) / self.workers))
+        return [messages[i:i + size] for i in range(0, len(messages), size)]
+
+    def _map(self, func, messages):
+        """func applied to each chunk in the pool, results in chunk order"""
+        chunks = self._chunks(messages)
+        try:
+            results = list(self._get_executor().map(func, chunks))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); rebuild the pool next time
+            with self._lock:
+                self._executor = None
+            self.fallbacks += 1
+            return None
+        self.parallel_calls += 1
+        self.parallel_messages += len(messages)
+        self.chunks += len(chunks)
+        return results
+
+    def parse(self, messages, parse=parse_sms):
+        """Parsed records for ``messages``, in order
+
+        ``parse`` is the inline parser used for small batches.
+        """
+        messages = list(messages)
+        if self.use_for(len(messages)):
+            results = self._map(_parse_chunk, messages)
+            if results is not None:
+                return [record for chunk in results for record in chunk]
+        return [parse(sms) for sms in messages]
+
+    def parse_batch(self, messages, parse=parse_sms):
+        """ParsedBatch for ``messages``; workers send back columns, not dicts"""
+        messages = list(messages)
+        if self.use_for(len(messages)):
+            results = self._map(_batch_chunk, messages)
+            if results is not None:
+                return ParsedBatch.concat(results)
+        return ParsedBatch.parse(messages, parse)
+
+    def accumulate(self, messages, parse=parse_sms):
+        """SummaryAccumulator over ``messages``, same as adding them in order"""
+        messages = list(messages)
+        if self.use_for(len(messages)):
+            results = self._map(_accumulate_chunk, messages)
+            if results is not None:
+                accumulator = SummaryAccumulator()
+                for chunk in results:
+                    accumulator.merge(chunk)
+                return accumulator
+        accumulator = SummaryAccumulator()
+        for sms in messages:
+            accumulator.add(parse(sms))
+        return accumulator
+
+    def warmup(self):
+        """Start the worker processes so the first large batch does not wait"""
+        if self.enabled:
+            list(self._get_executor().map(_parse_chunk, [[]] * self.workers))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "threshold": self.threshold,
+            "chunk_size": self.chunk_size,
+            "parallel_calls": self.parallel_calls,
+            "parallel_messages": self.parallel_messages,
+            "chunks": self.chunks,
+            "fallbacks": self.fallbacks,
+        }
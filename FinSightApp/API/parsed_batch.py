@@ -0,0 +1,190 @@
+"""
+Columnar parse results for a batch of SMS.
+
+/debug-sms-analysis used to keep a dict per message, parse the whole list
+a second time for the summary and then walk the dicts again for every
+count. ParsedBatch holds one parse of the batch as four numpy columns
+(type code, amount, balance, date as YYYYMMDD), and the summary, the
+per-type breakdown, the issue counts and the per-message listing are all
+computed from those columns.
+
+Totals are summed with np.bincount, which adds in row order, so they are
+bit-for-bit the totals SummaryAccumulator.add() produces.
+"""
+
+import numpy as np
+
+from summary import MONTHLY_TYPES, TOTAL_TYPES, SummaryAccumulator, _date_key
+
+# Every type parse_sms can return; unexpected ones are appended per batch
+TYPES = ('other', 'sent', 'received', 'withdrawn', 'airtime', 'transaction')
+OTHER = TYPES.index('other')
+NO_DATE = -1
+
+
+def _date_code(date):
+    # 'YYYY-MM-DD' -> YYYYMMDD; month and day are always two digits, so
+    # this also works for parse_sms' unpadded years below 1000
+    return NO_DATE if date is None else int(date.replace('-', ''))
+
+
+def _date_text(code):
+    """parse_sms' date string for a YYYYMMDD code"""
+    return f"{code // 10000}-{code // 100 % 100:02d}-{code % 100:02d}"
+
+
+class ParsedBatch:
+    """Parse results of a batch of messages, one array per field"""
+
+    def __init__(self, types, type_codes, amounts, balances, dates):
+        self.types = types  # type code -> type name
+        self.type_codes = type_codes  # uint8
+        self.amounts = amounts  # float64, 0 without an amount
+        self.balances = balances  # float64, NaN without a balance
+        self.dates = dates  # int32 YYYYMMDD, NO_DATE without a date
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    @classmethod
+    def from_records(cls, records):
+        """Batch from parse_sms() dicts (consumed once, not kept)"""
+        types = list(TYPES)
+        codes = {tx_type: i for i, tx_type in enumerate(types)}
+        type_codes = []
+        amounts = []
+        balances = []
+        dates = []
+        nan = float('nan')
+        for record in records:
+            tx_type = record['type']
+            code = codes.get(tx_type)
+            if code is None:
+                code = codes[tx_type] = len(types)
+                types.append(tx_type)
+            type_codes.append(code)
+            amounts.append(record['amount'])
+            balance = record['balance']
+            balances.append(nan if balance is None else balance)
+            dates.append(_date_code(record['date']))
+        return cls(
+            tuple(types),
+            np.array(type_codes, dtype=np.uint8),
+            np.array(amounts, dtype=np.float64),
+            np.array(balances, dtype=np.float64),
+            np.array(dates, dtype=np.int32),
+        )
+
+    @classmethod
+    def parse(cls, messages, parse):
+        return cls.from_records(parse(sms) for sms in messages)
+
+    @classmethod
+    def concat(cls, batches):
+        """One batch holding ``batches`` in order"""
+        batches = list(batches)
+        types = list(TYPES)
+        for batch in batches:
+            types.extend(t for t in batch.types if t not in types)
+        remapped = []
+        for batch in batches:
+            if batch.types == tuple(types[:len(batch.types)]):
+                remapped.append(batch.type_codes)
+            else:
+                lookup = np.array([types.index(t) for t in batch.types], dtype=np.uint8)
+                remapped.append(lookup[batch.type_codes])
+        column = lambda name, dtype: np.concatenate([getattr(b, name) for b in batches] or [np.empty(0, dtype)])
+        return cls(
+            tuple(types),
+            np.concatenate(remapped or [np.empty(0, np.uint8)]),
+            column('amounts', np.float64),
+            column('balances', np.float64),
+            column('dates', np.int32),
+        )
+
+    def code_of(self, tx_type):
+        return self.types.index(tx_type) if tx_type in self.types else -1
+
+    def transaction_mask(self):
+        """Rows counted as transactions: an amount and a known type"""
+        return (self.amounts > 0) & (self.type_codes != OTHER)
+
+    def accumulator(self):
+        """SummaryAccumulator equal to adding every record in order"""
+        acc = SummaryAccumulator()
+        acc.transactions_count = len(self)
+        is_tx = self.transaction_mask()
+        acc.amount_transactions_count = int(is_tx.sum())
+
+        tx_codes = self.type_codes[is_tx]
+        tx_amounts = self.amounts[is_tx]
+        by_type = np.bincount(tx_codes, weights=tx_amounts, minlength=len(self.types))
+        for tx_type in TOTAL_TYPES:
+            code = self.code_of(tx_type)
+            if code >= 0:
+                acc.totals[tx_type] = float(by_type[code])
+
+        tx_dates = self.dates[is_tx]
+        monthly = np.isin(tx_codes, [self.code_of(t) for t in MONTHLY_TYPES]) & (tx_dates != NO_DATE)
+        if monthly.any():
+            months, inverse = np.unique(tx_dates[monthly] // 100, return_inverse=True)
+            totals = np.bincount(inverse, weights=tx_amounts[monthly])
+            for month, total in zip(months.tolist(), totals.tolist()):
+                acc.monthly[f"{month // 100:04d}-{month % 100:02d}"] = total
+
+        has_balance = ~np.isnan(self.balances)
+        dated = np.flatnonzero(has_balance & (self.dates != NO_DATE))
+        if dated.size:
+            # argmax returns the first of equal dates, like the strict '>' in add()
+            position = int(dated[np.argmax(self.dates[dated])])
+            date = _date_key(_date_text(int(self.dates[position])))
+            acc.dated_balance = (date, position, float(self.balances[position]))
+        undated = np.flatnonzero(has_balance & (self.dates == NO_DATE))
+        if undated.size:
+            position = int(undated[0])
+            acc.undated_balance = (position, float(self.balances[position]))
+        return acc
+
+    def summary(self):
+        return self.accumulator().summary()
+
+    def type_breakdown(self):
+        """{type: {'count', 'total_amount'}} in order of first appearance"""
+        if not len(self):
+            return {}
+        counts = np.bincount(self.type_codes, minlength=len(self.types))
+        positive = self.amounts > 0
+        totals = np.bincount(self.type_codes[positive], weights=self.amounts[positive], minlength=len(self.types))
+        has_amount = np.bincount(self.type_codes[positive], minlength=len(self.types))
+        present, first = np.unique(self.type_codes, return_index=True)
+        breakdown = {}
+        for code in present[np.argsort(first)].tolist():
+            breakdown[self.types[code]] = {
+                'count': int(counts[code]),
+                # An int 0 when the type never had an amount, as before
+                'total_amount': float(totals[code]) if has_amount[code] else 0,
+            }
+        return breakdown
+
+    def count_type(self, tx_type):
+        return int(np.count_nonzero(self.type_codes == self.code_of(tx_type)))
+
+    def count_without_amount(self):
+        return int(np.count_nonzero(self.amounts == 0))
+
+    def records(self):
+        """(type, amount, date, balance) per message, in order
+
+        A zero amount comes back as int 0, the value parse_sms uses when a
+        message has no amount (a matched "0 RWF" was 0.0).
+        """
+        types = self.types
+        for code, amount, date, balance in zip(
+            self.type_codes.tolist(), self.amounts.tolist(), self.dates.tolist(), self.balances.tolist()
+        ):
+            yield (
+                types[code],
+                amount if amount else 0,
+                None if date == NO_DATE else _date_text(date),
+                None if balance != balance else balance,  # NaN -> None
+            )
@@ -0,0 +1,250 @@
+"""
+Content-addressed cache for spam predictions.
+
+The same promo spam reaches thousands of users and the app re-scans the
+same inbox on every refresh. Predictions are cached under a hash of the
+message text as the tokenizer sees it plus a fingerprint of the model
+artifacts, so a hit skips tokenization and inference entirely and a new
+model or tokenizer never serves stale results.
+
+Two backends are available:
+- memory: per-process LRU (default)
+- sqlite: a local SQLite file shared by all uvicorn workers on the host
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE", "1") != "0"
+PREDICTION_CACHE_BACKEND = os.getenv("PREDICTION_CACHE_BACKEND", "memory")
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0"))  # seconds, 0 = no expiry
+PREDICTION_CACHE_PATH = os.getenv("PREDICTION_CACHE_PATH", "prediction_cache.db")
+
+DEFAULT_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+
+def artifact_fingerprint(paths):
+    """Hash of the model/tokenizer files; changes whenever any of them does"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        try:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        except OSError:
+            digest.update(b'<missing>')
+    return digest.hexdigest()[:16]
+
+
+class TextNormalizer:
+    """Reduce a message to the word sequence the tokenizer will see
+
+    Mirrors Keras' text_to_word_sequence (lowercase, filter characters
+    become the split character, empty tokens dropped), so two messages
+    with the same normalized text always get the same model input.
+    """
+
+    def __init__(self, tokenizer=None):
+        self.lower = getattr(tokenizer, 'lower', True)
+        self.split = getattr(tokenizer, 'split', ' ') or ' '
+        filters = getattr(tokenizer, 'filters', DEFAULT_FILTERS) or ''
+        self.table = str.maketrans({c: self.split for c in filters})
+        # Character-level or custom analyzers split text differently; fall
+        # back to hashing the (lowercased) text as-is.
+        self.exact = bool(getattr(tokenizer, 'char_level', False) or getattr(tokenizer, 'analyzer', None))
+
+    def __call__(self, text, lowered=False):
+        """Normalized text; ``lowered`` says text is already lowercased"""
+        if self.lower and not lowered:
+            text = text.lower()
+        if self.exact:
+            return text
+        return self.split.join(token for token in text.translate(self.table).split(self.split) if token)
+
+
+def cache_key(fingerprint, normalized_text):
+    digest = hashlib.blake2b(normalized_text.encode('utf-8', 'surrogatepass'), digest_size=16,
+                             key=fingerprint.encode()[:64])
+    return digest.hexdigest()
+
+
+class _Stats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class MemoryPredictionCache:
+    """Bounded in-process LRU with optional TTL"""
+
+    backend = "memory"
+
+    def __init__(self, max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.max_size = max(1, int(max_size))
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def get_many(self, keys):
+        """Cached value for each key, None for misses"""
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl and entry[1] <= now:
+                    del self._entries[key]
+                    self._stats.expirations += 1
+                    entry = None
+                if entry is None:
+                    self._stats.misses += 1
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats.hits += 1
+                    values.append(entry[0])
+        return values
+
+    def set_many(self, items):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "size": len(self),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self._stats.hits,
+            "misses": self._stats.misses,
+            "evictions": self._stats.evictions,
+            "expirations": self._stats.expirations,
+        }
+
+
+class SQLitePredictionCache(MemoryPredictionCache):
+    """LRU with optional TTL in a SQLite file shared by all workers
+
+    Hit/miss counters are per process; size is the shared table size.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path=PREDICTION_CACHE_PATH, max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        conn = self._connect()
+        now = time.time()
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows = conn.execute(
+                "SELECT key, value, expires_at FROM predictions WHERE key IN (%s)" % ",".join("?" * len(chunk)),
+                chunk,
+            ).fetchall()
+            for key, value, expires_at in rows:
+                if expires_at is not None and expires_at <= now:
+                    self._stats.expirations += 1
+                    continue
+                found[key] = json.loads(value)
+
+        if found:
+            conn.executemany(
+                "UPDATE predictions SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+            )
+        values = []
+        for key in keys:
+            value = found.get(key)
+            if value is None:
+                self._stats.misses += 1
+            else:
+                self._stats.hits += 1
+            values.append(value)
+        return values
+
+    def set_many(self, items):
+        if not items:
+            return
+        conn = self._connect()
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), expires_at, now) for key, value in items],
+            )
+            conn.execute("DELETE FROM predictions WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            excess = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.max_size
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM predictions WHERE key IN"
+                    " (SELECT key FROM predictions ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._stats.evictions += excess
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connect().execute("DELETE FROM predictions")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+def create_prediction_cache():
+    """Cache configured by the PREDICTION_CACHE_* environment variables"""
+    if not PREDICTION_CACHE_ENABLED:
+        return None
+    if PREDICTION_CACHE_BACKEND == "sqlite":
+        return SQLitePredictionCache()
+    return MemoryPredictionCache()
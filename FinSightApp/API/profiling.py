@@ -0,0 +1,325 @@
+"""
+On-demand profiling of single requests.
+
+When one customer's inbox makes /predict-sms slow (say a message that sends
+one of parse_sms' '.*?' rules into heavy backtracking), the cause has to
+be found on the live server. A request is profiled when:
+
+- it carries X-Profile: <PROFILE_TOKEN> (any path), or
+- it hits one of PROFILE_PATHS and wins a PROFILE_SAMPLE_RATE draw.
+
+A profiled request runs its thread-pool work (run_in_threadpool below,
+which main.py uses everywhere) under cProfile. After the response is
+sent, its messages are replayed through every sms_parser pattern that
+parse_sms could try on them, timing each search. The report holds:
+- the hottest functions;
+- per-pattern totals;
+- the slowest single search, with the message length but never the text.
+
+Reports are written to a bounded ring of JSON files in PROFILE_DIR (the
+oldest is dropped beyond PROFILE_KEEP), and the response gets an
+X-Profile-Id header; GET /profiles/{id} returns the report. With
+X-Profile-Inline: 1 a JSON response comes back as
+{"result": <response>, "profile": <report>} instead.
+
+Parsing done in the process pool (large batches, see parallel_parse.py)
+shows up in cProfile only as waiting; the regex replay still covers it.
+
+With neither PROFILE_TOKEN nor PROFILE_SAMPLE_RATE set, the middleware is
+not installed and run_in_threadpool costs one context variable lookup.
+"""
+
+import cProfile
+import contextvars
+import functools
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from time import perf_counter
+
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+
+from sms_parser import (
+    AMOUNT_ANCHOR, BALANCE_PATTERNS, DATE_PATTERNS, FAMILIES, GENERAL_AMOUNT, scan_keywords,
+)
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_PATHS = tuple(
+    path.strip() for path in os.getenv(
+        "PROFILE_PATHS", "/predict-sms,/predict-sms/incremental,/analyze,/debug-sms-analysis,/predict-spam"
+    ).split(",") if path.strip()
+)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "25"))
+PROFILE_MAX_BODY = int(os.getenv("PROFILE_MAX_BODY", str(32 * 1024 * 1024)))  # bytes kept for the replay
+PROFILE_ENABLED = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+# The profile session of the request being handled, if it is profiled
+_session = contextvars.ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """cProfile data collected from every thread working on one request"""
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        return profile.runcall(func, *args, **kwargs)
+
+    def hot_functions(self, top=PROFILE_TOP):
+        if not self._profiles:
+            return []
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        return [
+            {
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "own_ms": own * 1000,
+                "cumulative_ms": cumulative * 1000,
+            }
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows
+        ]
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """fastapi's run_in_threadpool, under the request's profiler if it has one"""
+    session = _session.get()
+    if session is not None:
+        func = functools.partial(session.call, func)
+    return await _run_in_threadpool(func, *args, **kwargs)
+
+
+# =======================
+# Regex replay
+# =======================
+
+def _gated_patterns():
+    """(family, pattern, literals or None) for every pattern parse_sms may run"""
+    patterns = [("anchor", AMOUNT_ANCHOR, None), ("amount", GENERAL_AMOUNT, None)]
+    for family, _, rules in FAMILIES:
+        patterns.extend((family, pattern, literals) for pattern, literals in rules)
+    patterns.extend(("balance", pattern, literals) for pattern, literals in BALANCE_PATTERNS)
+    patterns.extend(("date", pattern, None) for pattern in DATE_PATTERNS)
+    return patterns
+
+
+PATTERNS = _gated_patterns()
+
+
+def regex_timings(messages, top=PROFILE_TOP):
+    """Time each pattern parse_sms could try on each message
+
+    A pattern counts as tried when its keyword gate passes, whether or
+    not an earlier rule would have matched first, so totals are an upper
+    bound of the live parser's.
+    """
+    totals = {}
+    slowest = None
+    for sms in messages:
+        if not isinstance(sms, str):
+            continue
+        sms_lower = sms.lower()
+        found = scan_keywords(sms_lower)
+        for family, pattern, literals in PATTERNS:
+            if literals is not None and found.isdisjoint(literals):
+                continue
+            # Dates are searched in the original text, everything else lowercased
+            text = sms if family == "date" else sms_lower
+            started = perf_counter()
+            pattern.search(text)
+            seconds = perf_counter() - started
+            entry = totals.get(pattern.pattern)
+            if entry is None:
+                entry = totals[pattern.pattern] = {
+                    "family": family, "pattern": pattern.pattern, "calls": 0,
+                    "total_ms": 0.0, "max_ms": 0.0, "max_message_length": 0,
+                }
+            entry["calls"] += 1
+            entry["total_ms"] += seconds * 1000
+            if seconds * 1000 > entry["max_ms"]:
+                entry["max_ms"] = seconds * 1000
+                entry["max_message_length"] = len(sms)
+            if slowest is None or seconds * 1000 > slowest["ms"]:
+                slowest = {"family": family, "pattern": pattern.pattern, "ms": seconds * 1000,
+                           "message_length": len(sms)}
+    patterns = sorted(totals.values(), key=lambda entry: entry["total_ms"], reverse=True)[:top]
+    return {"messages": len(messages), "slowest": slowest, "patterns": patterns}
+
+
+def _request_messages(body):
+    """Messages in a JSON request body (messages and/or text)"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return []
+    if not isinstance(payload, dict):
+        return []
+    messages = payload.get("messages")
+    messages = list(messages) if isinstance(messages, list) else []
+    if isinstance(payload.get("text"), str):
+        messages.append(payload["text"])
+    return messages
+
+
+# =======================
+# Ring buffer
+# =======================
+
+class ProfileStore:
+    """Newest ``keep`` reports as JSON files in ``directory``"""
+
+    def __init__(self, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.keep = max(1, keep)
+
+    def save(self, report):
+        os.makedirs(self.directory, exist_ok=True)
+        # Names sort by time, so the oldest files come first
+        path = os.path.join(self.directory, f"{int(report['started_at'] * 1000):015d}-{report['id']}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        os.replace(path + ".tmp", path)
+        for name in self._names()[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass  # Another worker removed it first
+
+    def _names(self):
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def list(self):
+        return [name[16:-5] for name in reversed(self._names())]
+
+    def load(self, profile_id):
+        for name in self._names():
+            if name[16:-5] == profile_id:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    return json.load(f)
+        return None
+
+
+# =======================
+# Middleware
+# =======================
+
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """Profiles requests selected by the admin header or the sampling rate"""
+
+    def __init__(self, app, store=None, token=PROFILE_TOKEN, sample_rate=PROFILE_SAMPLE_RATE,
+                 paths=PROFILE_PATHS):
+        self.app = app
+        self.store = store or ProfileStore()
+        self.token = token
+        self.sample_rate = sample_rate
+        self.paths = frozenset(paths)
+
+    def _trigger(self, scope):
+        if scope["path"].startswith("/profiles"):
+            return None  # Reading reports is not profiled
+        if self.token and _header(scope, b"x-profile") == self.token:
+            return "header"
+        if self.sample_rate and scope["path"] in self.paths and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trigger = self._trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+        await self._profile(scope, receive, send, trigger)
+
+    async def _profile(self, scope, receive, send, trigger):
+        profile_id = uuid.uuid4().hex[:12]
+        inline = trigger == "header" and _header(scope, b"x-profile-inline") == "1"
+        session = ProfileSession()
+        body = []
+        body_size = [0]
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request" and body_size[0] < PROFILE_MAX_BODY:
+                body.append(message.get("body", b""))
+                body_size[0] += len(body[-1])
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = list(message.get("headers", []))
+                response["headers"] = headers
+                is_json = any(k == b"content-type" and v.startswith(b"application/json") for k, v in headers)
+                response["inline"] = inline and is_json
+                if response["inline"]:
+                    return  # Sent with the report once the body is complete
+                message = {**message, "headers": headers + [(b"x-profile-id", profile_id.encode())]}
+            elif message["type"] == "http.response.body" and response.get("inline"):
+                response["body"].append(message.get("body", b""))
+                return
+            await send(message)
+
+        started_at = time.time()
+        started = perf_counter()
+        token = _session.set(session)
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            _session.reset(token)
+        wall = perf_counter() - started
+
+        report = await _run_in_threadpool(
+            self._report, profile_id, scope, trigger, started_at, wall, response["status"], session, b"".join(body)
+        )
+        if response.get("inline"):
+            result = b"".join(response["body"])
+            content = b'{"result":' + (result or b"null") + b',"profile":' + json.dumps(report).encode() + b"}"
+            headers = [(k, v) for k, v in response["headers"] if k != b"content-length"]
+            headers += [(b"content-length", str(len(content)).encode()), (b"x-profile-id", profile_id.encode())]
+            await send({"type": "http.response.start", "status": response["status"], "headers": headers})
+            await send({"type": "http.response.body", "body": content})
+
+    def _report(self, profile_id, scope, trigger, started_at, wall, status, session, body):
+        report = {
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "trigger": trigger,
+            "status": status,
+            "started_at": started_at,
+            "wall_ms": wall * 1000,
+            "hot_functions": session.hot_functions(),
+            "regex": regex_timings(_request_messages(body)) if body else None,
+        }
+        try:
+            self.store.save(report)
+        except OSError as e:
+            print(f"⚠️ Could not save profile {profile_id}: {e}")
+        print(f"🔬 Profiled {scope['method']} {scope['path']} ({trigger}): {wall * 1000:.1f} ms, id {profile_id}")
+        return report
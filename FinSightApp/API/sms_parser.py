@@ -0,0 +1,255 @@
+"""
+Compiled SMS transaction parser.
+
+parse_sms() used to rebuild its pattern lists on every call and run up to
+~35 separate regex scans plus a dozen keyword passes per message. This
+module compiles the same rules once at import and uses a single keyword
+sweep to find out which rule families can apply, so most patterns are
+never tried.
+
+The output is identical to the original cascade: the same regexes are
+tried in the same order, and a pattern is skipped only when a literal it
+needs is absent from the message. check_parse_sms_golden.py verifies this
+against a recorded corpus.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+AMOUNT = r'(\d+(?:,\d{3})*)'
+
+# Keywords that open each rule family, exactly as in the original cascade
+SENT_KEYWORDS = ('sent', 'transferred', 'paid', 'payment to', 'transfer to', 'sent to', 'paid to')
+RECEIVED_KEYWORDS = ('received', 'credited', 'deposit', 'salary', 'refund', 'deposited', 'income', 'earning')
+WITHDRAW_KEYWORDS = ('withdraw', 'atm', 'cash')
+AIRTIME_KEYWORDS = ('airtime', 'bundle')
+SENT_CONTEXT_WORDS = ('to', 'paid', 'sent')
+RECEIVED_CONTEXT_WORDS = ('from', 'received', 'credited', 'deposit', 'deposited', 'income', 'earning')
+
+# Rules are (pattern, literals): the pattern can only match when at least
+# one of the literals occurs in the lowercased message.
+SENT_RULES = [
+    (AMOUNT + r'\s*rwf\s+(?:sent|transferred|paid)\s+to', ('sent', 'transferred', 'paid')),
+    (r'(?:sent|transferred|paid).*?' + AMOUNT + r'\s*rwf', ('sent', 'transferred', 'paid')),
+    (r'payment\s+of\s+' + AMOUNT + r'\s*rwf\s+to', ('payment',)),
+    (r'transfer\s+of\s+' + AMOUNT + r'\s*rwf', ('transfer',)),
+    (r'you\s+have\s+sent\s+' + AMOUNT + r'\s*rwf', ('sent',)),
+]
+
+RECEIVED_RULES = [
+    (r'received.*?' + AMOUNT + r'\s*rwf', ('received',)),
+    (AMOUNT + r'\s*rwf.*?received', ('received',)),
+    (r'credited.*?' + AMOUNT + r'\s*rwf', ('credited',)),
+    (r'deposit.*?' + AMOUNT + r'\s*rwf', ('deposit',)),
+    (r'deposited.*?' + AMOUNT + r'\s*rwf', ('deposited',)),
+    (AMOUNT + r'\s*rwf.*?deposited', ('deposited',)),
+    (AMOUNT + r'\s*rwf.*?deposit', ('deposit',)),
+    (r'you\s+have\s+received\s+' + AMOUNT + r'\s*rwf', ('received',)),
+    (r'payment.*?' + AMOUNT + r'\s*rwf.*?from', ('payment',)),
+    (r'income.*?' + AMOUNT + r'\s*rwf', ('income',)),
+    (r'earning.*?' + AMOUNT + r'\s*rwf', ('earning',)),
+]
+
+WITHDRAW_RULES = [
+    (r'withdrawn.*?' + AMOUNT + r'\s*rwf', ('withdrawn',)),
+    (AMOUNT + r'\s*rwf.*?withdrawn', ('withdrawn',)),
+    (r'withdraw.*?' + AMOUNT + r'\s*rwf', ('withdraw',)),
+    (r'cash.*?' + AMOUNT + r'\s*rwf', ('cash',)),
+    (r'atm.*?' + AMOUNT + r'\s*rwf', ('atm',)),
+]
+
+AIRTIME_RULES = [
+    (r'airtime.*?' + AMOUNT + r'\s*rwf', ('airtime',)),
+    (r'bundle.*?' + AMOUNT + r'\s*rwf', ('bundle',)),
+    (AMOUNT + r'\s*rwf.*?airtime', ('airtime',)),
+    (AMOUNT + r'\s*rwf.*?bundle', ('bundle',)),
+    (r'bought.*?' + AMOUNT + r'\s*rwf.*?(?:airtime|bundle)', ('bought',)),
+]
+
+BALANCE_RULES = [
+    (r'new\s+balance[:\s]*' + AMOUNT + r'\s*rwf', ('new',)),            # "New balance: 179524 RWF"
+    (r'balance[:\s]*' + AMOUNT + r'\s*rwf', ('balance',)),              # "Balance: 179524 RWF"
+    (r'current\s+balance[:\s]*' + AMOUNT + r'\s*rwf', ('current',)),    # "Current balance: 179524 RWF"
+    (r'your\s+balance\s+is\s+' + AMOUNT + r'\s*rwf', ('your',)),        # "Your balance is 179524 RWF"
+    (r'balance\s+is\s+now\s+' + AMOUNT + r'\s*rwf', ('now',)),          # "Balance is now 179524 RWF"
+    (r'remaining\s+balance[:\s]*' + AMOUNT + r'\s*rwf', ('remaining',)),  # "Remaining balance: 179524 RWF"
+]
+
+GENERAL_AMOUNT = re.compile(AMOUNT + r'\s*rwf')
+
+# (type, family keywords, compiled rules) in the order the cascade tries them
+FAMILIES = [
+    ('sent', SENT_KEYWORDS, [(re.compile(p), lits) for p, lits in SENT_RULES]),
+    ('received', RECEIVED_KEYWORDS, [(re.compile(p), lits) for p, lits in RECEIVED_RULES]),
+    ('withdrawn', WITHDRAW_KEYWORDS, [(re.compile(p), lits) for p, lits in WITHDRAW_RULES]),
+    ('airtime', AIRTIME_KEYWORDS, [(re.compile(p), lits) for p, lits in AIRTIME_RULES]),
+]
+BALANCE_PATTERNS = [(re.compile(p), lits) for p, lits in BALANCE_RULES]
+
+# Date patterns run on the original (not lowercased) text
+DATE_PATTERNS = [
+    re.compile(r'at\s+(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})'),  # "at 2025-07-05 17:12:24"
+    re.compile(r'on\s+(\d{4}-\d{2}-\d{2})'),                        # "on 2025-07-05"
+    re.compile(r'on\s+(\d{1,2}\s+\w+\s+\d{4})'),                   # "on 5 July 2025"
+    re.compile(r'(\d{4}-\d{2}-\d{2})'),                             # "2025-07-05"
+    re.compile(r'(\d{1,2}/\d{1,2}/\d{4})'),                         # "05/07/2025"
+]
+ISO_DATE = DATE_PATTERNS[3]
+
+
+SCAN_WORDS = tuple(sorted(set(
+    SENT_KEYWORDS + RECEIVED_KEYWORDS + WITHDRAW_KEYWORDS + AIRTIME_KEYWORDS
+    + SENT_CONTEXT_WORDS + RECEIVED_CONTEXT_WORDS
+    + tuple(lit for rules in (SENT_RULES, RECEIVED_RULES, WITHDRAW_RULES, AIRTIME_RULES, BALANCE_RULES)
+            for _, lits in rules for lit in lits)
+)))
+
+# Every amount and balance pattern captures digits followed by 'rwf'
+AMOUNT_ANCHOR = re.compile(r'\d\s*rwf')
+
+
+def scan_keywords(sms_lower):
+    """Set of scan words present in the lowercased message
+
+    One sweep over the deduplicated vocabulary. Plain substring checks run
+    in C and measured about 3x faster than a single regex alternation with
+    lookahead (needed to catch overlapping keywords) on real SMS.
+    """
+    return {word for word in SCAN_WORDS if word in sms_lower}
+
+
+def safe_float_from_match(match):
+    if match and match.group(1):
+        s = match.group(1).replace(',', '').strip()
+        if s:
+            try:
+                return float(s)
+            except ValueError:
+                return 0
+    return 0
+
+
+@lru_cache(maxsize=4096)
+def _format_date(date_str):
+    """'YYYY-MM-DD' for a matched date string, None if it is not a valid date"""
+    try:
+        if ' ' in date_str and ':' in date_str:
+            # Format: "2025-07-05 17:12:24"
+            date = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+        elif len(date_str) == 10 and '-' in date_str:
+            # Format: "2025-07-05"
+            date = datetime.strptime(date_str, '%Y-%m-%d')
+        elif '/' in date_str:
+            # Format: "05/07/2025"
+            date = datetime.strptime(date_str, '%d/%m/%Y')
+        else:
+            # Format: "5 July 2025"
+            date = datetime.strptime(date_str, '%d %B %Y')
+    except ValueError:
+        return None
+    return date.strftime('%Y-%m-%d')
+
+
+def extract_date(sms):
+    """First date pattern (in priority order) that yields a valid date"""
+    # Patterns 1 and 2 contain the bare ISO pattern, so they can only match
+    # where it does.
+    iso_match = ISO_DATE.search(sms) if '-' in sms else None
+    for i, pattern in enumerate(DATE_PATTERNS):
+        if i in (0, 1, 3):
+            if iso_match is None:
+                continue
+        elif i == 2:
+            if 'on' not in sms:
+                continue
+        elif '/' not in sms:
+            continue
+        date_match = iso_match if i == 3 else pattern.search(sms)
+        if date_match:
+            date = _format_date(date_match.group(1))
+            if date is not None:
+                return date
+    return None
+
+
+def _first_match(rules, found, sms_lower):
+    for pattern, literals in rules:
+        for literal in literals:
+            if literal in found:
+                break
+        else:
+            continue
+        match = pattern.search(sms_lower)
+        if match:
+            return match
+    return None
+
+
+def classify(sms_lower):
+    """(tx_type, amount match, balance match) for a lowercased SMS"""
+    tx_type = 'other'
+    amount_match = None
+    balance_match = None
+
+    # Every amount and balance pattern needs digits right before 'rwf';
+    # without them only the date can be found.
+    if 'rwf' not in sms_lower or not AMOUNT_ANCHOR.search(sms_lower):
+        return tx_type, amount_match, balance_match
+
+    found = scan_keywords(sms_lower)
+
+    for family_type, keywords, rules in FAMILIES:
+        if found.isdisjoint(keywords):
+            continue
+        match = _first_match(rules, found, sms_lower)
+        if match:
+            tx_type = family_type
+            amount_match = match
+            break
+
+    # If still no specific type found, try to get amount ('rwf' is one of
+    # the transaction indicators, so the indicator check always passes here)
+    if tx_type == 'other':
+        general_amount_match = GENERAL_AMOUNT.search(sms_lower)
+        if general_amount_match:
+            amount_match = general_amount_match
+            # Try to infer transaction type from context
+            if not found.isdisjoint(SENT_CONTEXT_WORDS):
+                tx_type = 'sent'
+            elif not found.isdisjoint(RECEIVED_CONTEXT_WORDS):
+                tx_type = 'received'
+            else:
+                tx_type = 'transaction'  # Generic transaction type
+
+    if 'balance' in found:
+        balance_match = _first_match(BALANCE_PATTERNS, found, sms_lower)
+
+    return tx_type, amount_match, balance_match
+
+
+def parse_sms(sms, sms_lower=None):
+    """Extract transaction type, amount, date and balance from one SMS
+
+    ``sms_lower`` is sms.lower() when the caller already has it.
+    """
+    tx_type, amount_match, balance_match = classify(sms.lower() if sms_lower is None else sms_lower)
+    return {
+        "type": tx_type,
+        "amount": safe_float_from_match(amount_match) if amount_match else 0,
+        "date": extract_date(sms),  # Already a JSON serializable string
+        "balance": safe_float_from_match(balance_match) if balance_match else None
+    }
+
+
+def date_candidates(sms):
+    """(start, end) of every date pattern's first match, in priority order
+
+    extract_date() takes the first of these that is a valid date.
+    """
+    spans = []
+    for pattern in DATE_PATTERNS:
+        date_match = pattern.search(sms)
+        if date_match:
+            spans.append(date_match.span(1))
+    return spans
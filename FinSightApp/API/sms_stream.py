@@ -0,0 +1,115 @@
+"""
+Streaming NDJSON ingestion for whole-inbox imports.
+
+/predict-sms/stream reads the request body as it arrives, one message per
+line, and streams results back the same way. Messages are handled in
+small batches, so memory stays bounded by SMS_STREAM_BATCH_SIZE messages
+plus one partial line, whatever the size of the inbox.
+
+Input lines are either a JSON string or an object with a "text" field and
+an optional "id" that is echoed back. Blank lines are ignored.
+
+Output lines:
+    {"type": "result", "line": 3, "id": ..., "parsed": {...}, "spam": {...}}
+    {"type": "error", "line": 4, "message": "..."}
+    {"type": "summary", "processed": 500, "final": false, ...summary fields}
+A final summary (with "final": true) ends the stream, unless admission
+control rejects a batch part way through. The stream then ends with
+    {"type": "error", "line": 129, "status": 429, "message": "...", "retry_after": 3}
+and lines from "line" on were not processed.
+"""
+
+import json
+import os
+
+from starlette.responses import StreamingResponse
+
+SMS_STREAM_BATCH_SIZE = int(os.getenv("SMS_STREAM_BATCH_SIZE", "64"))
+SMS_STREAM_SUMMARY_EVERY = int(os.getenv("SMS_STREAM_SUMMARY_EVERY", "500"))
+SMS_STREAM_MAX_LINE_BYTES = int(os.getenv("SMS_STREAM_MAX_LINE_BYTES", "65536"))
+
+
+def _decode_line(line):
+    """(message, id, error) for one NDJSON line; None for a blank line"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        return None, None, f"invalid JSON: {e}"
+    if isinstance(item, str):
+        return item, None, None
+    if isinstance(item, dict) and isinstance(item.get("text"), str):
+        return item["text"], item.get("id"), None
+    return None, None, 'expected a JSON string or an object with a "text" string'
+
+
+async def read_ndjson(chunks, max_line_bytes=SMS_STREAM_MAX_LINE_BYTES):
+    """Yield (line_number, message, id, error) for each non-blank line
+
+    ``chunks`` is an async iterator of bytes, e.g. request.stream(). Lines
+    longer than ``max_line_bytes`` are reported as errors and discarded
+    without being buffered.
+    """
+    buffer = bytearray()
+    line_number = 0
+    overlong = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                break
+            line = bytes(buffer[:newline])
+            del buffer[:newline + 1]
+            line_number += 1
+            if overlong or newline > max_line_bytes:
+                overlong = False
+                yield line_number, None, None, f"line longer than {max_line_bytes} bytes"
+                continue
+            decoded = _decode_line(line)
+            if decoded is not None:
+                yield (line_number, *decoded)
+        if len(buffer) > max_line_bytes:
+            overlong = True
+        if overlong:
+            buffer.clear()
+
+    if overlong:
+        yield line_number + 1, None, None, f"line longer than {max_line_bytes} bytes"
+    elif buffer:
+        decoded = _decode_line(bytes(buffer))
+        if decoded is not None:
+            yield (line_number + 1, *decoded)
+
+
+async def batched(items, size):
+    """Group an async iterator into lists of at most ``size`` items"""
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class IngestStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body reads the request while it streams
+
+    Starlette normally calls receive() in parallel to watch for client
+    disconnects, which would steal body chunks from request.stream(). Here
+    the body reader is the only receiver; a disconnect surfaces as
+    ClientDisconnect from request.stream() and ends the generator.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def ndjson_line(obj):
+    return json.dumps(obj, ensure_ascii=False) + "\n"
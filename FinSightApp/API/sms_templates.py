@@ -0,0 +1,182 @@
+"""
+Template-learning fast path for parse_sms.
+
+Nearly all transaction SMS come from a few dozen operator templates (MTN
+MoMo, Airtel, bank alerts) that differ only in their digits. The template
+cache masks every digit, uses the resulting skeleton as key and stores a
+parse plan learned from the first message with that skeleton: the
+transaction type plus the offsets of the amount, balance and date fields.
+Later messages with the same skeleton are answered by slicing those
+offsets instead of running the regex cascade.
+
+Every pattern in sms_parser treats all digits alike (only \\d and \\w), so
+two messages with the same skeleton match at the same offsets and the
+plan reproduces parse_sms exactly. Date validity does depend on the digit
+values, so the plan keeps every candidate date span and re-checks them in
+priority order. TEMPLATE_VERIFY_RATE re-parses a sample of fast-path
+answers with the full parser and drops any template that disagrees.
+"""
+
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from sms_parser import _format_date, classify, date_candidates, parse_sms
+
+SMS_TEMPLATE_CACHE_ENABLED = os.getenv("SMS_TEMPLATE_CACHE", "1") != "0"
+SMS_TEMPLATE_CACHE_SIZE = int(os.getenv("SMS_TEMPLATE_CACHE_SIZE", "4096"))
+TEMPLATE_VERIFY_RATE = float(os.getenv("TEMPLATE_VERIFY_RATE", "0.01"))
+
+# Same-length mask: offsets stay valid across messages of one template.
+# Masking the UTF-8 bytes is ~8x faster than str.translate, and ASCII digit
+# bytes never occur inside multi-byte sequences.
+DIGIT_MASK = bytes.maketrans(b'123456789', b'000000000')
+
+
+def skeleton_of(sms):
+    return sms.encode('utf-8', 'surrogatepass').translate(DIGIT_MASK)
+
+
+class ParsePlan:
+    __slots__ = ('tx_type', 'amount_span', 'balance_span', 'date_spans')
+
+    def __init__(self, tx_type, amount_span, balance_span, date_spans):
+        self.tx_type = tx_type
+        self.amount_span = amount_span  # in the lowercased text
+        self.balance_span = balance_span  # in the lowercased text
+        self.date_spans = date_spans  # in the original text, priority order
+
+    def apply(self, sms, sms_lower=None):
+        if sms_lower is None:
+            sms_lower = sms.lower()
+        amount = 0
+        if self.amount_span:
+            start, end = self.amount_span
+            amount = float(sms_lower[start:end].replace(',', ''))
+        balance = None
+        if self.balance_span:
+            start, end = self.balance_span
+            balance = float(sms_lower[start:end].replace(',', ''))
+        date = None
+        for start, end in self.date_spans:
+            date = _format_date(sms[start:end])
+            if date is not None:
+                break
+        return {
+            "type": self.tx_type,
+            "amount": amount,
+            "date": date,
+            "balance": balance
+        }
+
+
+def learn_plan(sms, sms_lower=None):
+    """parse_sms() output for ``sms`` plus the plan that reproduces it"""
+    if sms_lower is None:
+        sms_lower = sms.lower()
+    tx_type, amount_match, balance_match = classify(sms_lower)
+    plan = ParsePlan(
+        tx_type,
+        amount_match.span(1) if amount_match else None,
+        balance_match.span(1) if balance_match else None,
+        date_candidates(sms),
+    )
+    return plan.apply(sms, sms_lower), plan
+
+
+class TemplateParser:
+    """Bounded LRU of parse plans keyed by digit-masked message skeleton"""
+
+    def __init__(self, max_size=SMS_TEMPLATE_CACHE_SIZE, verify_rate=TEMPLATE_VERIFY_RATE):
+        self.max_size = max(1, int(max_size))
+        self.verify_rate = float(verify_rate)
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.verified = 0
+        self.mismatches = 0
+
+    def parse(self, sms, sms_lower=None):
+        """Same result as parse_sms(sms), from a learned plan when possible
+
+        ``sms_lower`` is sms.lower() when the caller already has it.
+        """
+        skeleton = skeleton_of(sms)
+        with self._lock:
+            plan = self._plans.get(skeleton)
+            if plan is not None:
+                self._plans.move_to_end(skeleton)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if plan is None:
+            result, plan = learn_plan(sms, sms_lower)
+            # Non-transaction messages are cheap to parse and rarely repeat
+            if plan.tx_type != 'other' or plan.balance_span:
+                self._store(skeleton, plan)
+            return result
+
+        result = plan.apply(sms, sms_lower)
+        if self.verify_rate and random.random() < self.verify_rate:
+            expected = parse_sms(sms, sms_lower)
+            self.verified += 1
+            if expected != result:
+                self.mismatches += 1
+                with self._lock:
+                    self._plans.pop(skeleton, None)
+                return expected
+        return result
+
+    def _store(self, skeleton, plan):
+        with self._lock:
+            self._plans[skeleton] = plan
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+
+    def verify(self, messages):
+        """Compare the fast path with the full parser on ``messages``
+
+        Returns counts and the first few disagreements.
+        """
+        checked = 0
+        fast_path = 0
+        mismatched = 0
+        mismatches = []
+        for sms in messages:
+            skeleton = skeleton_of(sms)
+            with self._lock:
+                plan = self._plans.get(skeleton)
+            if plan is None:
+                _, plan = learn_plan(sms)
+            else:
+                fast_path += 1
+            actual = plan.apply(sms)
+            expected = parse_sms(sms)
+            checked += 1
+            if actual != expected:
+                mismatched += 1
+                if len(mismatches) < 20:
+                    mismatches.append({"sms": sms, "expected": expected, "fast_path": actual})
+        return {
+            "checked": checked,
+            "fast_path": fast_path,
+            "mismatched": mismatched,
+            "mismatches": mismatches,
+        }
+
+    def stats(self):
+        return {
+            "templates": len(self._plans),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "verify_rate": self.verify_rate,
+            "verified": self.verified,
+            "mismatches": self.mismatches,
+        }
@@ -0,0 +1,126 @@
+"""
+Rule stage in front of the spam model.
+
+Most messages we score are operator confirmations ("You have sent 5,000
+RWF to ... New balance: ... TxId: ...") that the SMS parser already
+recognizes, yet every one of them still went through the neural model.
+With SPAM_CASCADE=1 each message first gets a structural score from the
+parser's own rules:
+
+    +2  a transaction type and amount (classify())
+    +1  a balance
+    +1  an ISO date
+    +1  a transaction reference (TxId, Transaction Id, Ref)
+
+and a count of spam cues (prize/claim/click/PIN wording, links). A
+message scoring at least SPAM_CASCADE_HAM_SCORE with no spam cue is
+labelled ham by the rules. With SPAM_CASCADE_SPAM_CUES > 0, a message
+with that many cues and no recognized transaction is labelled spam.
+Everything else goes to the model as before. Each prediction carries
+"stage": "rules" or "model" ("unavailable" for every message while the
+model is not loaded).
+
+check_spam_cascade.py reports how often the rules agree with the full
+model and how many model calls they save.
+"""
+
+import os
+import re
+
+from sms_parser import ISO_DATE, classify
+
+SPAM_CASCADE_ENABLED = os.getenv("SPAM_CASCADE", "0") == "1"
+SPAM_CASCADE_HAM_SCORE = int(os.getenv("SPAM_CASCADE_HAM_SCORE", "4"))
+SPAM_CASCADE_SPAM_CUES = int(os.getenv("SPAM_CASCADE_SPAM_CUES", "0"))  # 0 = rules never say spam
+SPAM_CASCADE_CONFIDENCE = float(os.getenv("SPAM_CASCADE_CONFIDENCE", "0.99"))
+
+# Wording operators do not use in transaction confirmations
+SPAM_CUES = (
+    'congratulation', 'you won', 'you have won', 'winner', 'win ', 'prize', 'reward', 'gift',
+    'claim', 'click', 'selected', 'lottery', 'promo', 'bonus', 'free ', 'offer',
+    'urgent', 'immediately', 'blocked', 'suspend', 'deactivat', 'verify', 'confirm your',
+    'your pin', 'send your', 'reply', 'call ', 'dial *',
+)
+LINK = re.compile(r'https?://|www\.|\b[a-z0-9-]+\.(?:com|net|org|info|xyz|ly|me|co|link|click)\b')
+REFERENCE = re.compile(r'\b(?:txid|transaction\s+id|ref)\b')
+
+# classify() falls back to these for any amount it cannot attribute
+TYPED = ('sent', 'received', 'withdrawn', 'airtime')
+
+
+def spam_cues(sms_lower):
+    """Number of spam cues in a lowercased message"""
+    cues = sum(1 for cue in SPAM_CUES if cue in sms_lower)
+    return cues + bool(LINK.search(sms_lower))
+
+
+def structure_score(sms_lower):
+    """How much the message looks like an operator transaction record"""
+    tx_type, amount_match, balance_match = classify(sms_lower)
+    score = 0
+    if tx_type in TYPED and amount_match is not None:
+        score += 2
+    if balance_match is not None:
+        score += 1
+    if ISO_DATE.search(sms_lower):
+        score += 1
+    if REFERENCE.search(sms_lower):
+        score += 1
+    return score
+
+
+class SpamCascade:
+    """Decides the obvious messages, leaves the rest (None) to the model"""
+
+    def __init__(self, ham_score=SPAM_CASCADE_HAM_SCORE, spam_cues=SPAM_CASCADE_SPAM_CUES,
+                 confidence=SPAM_CASCADE_CONFIDENCE, ham_label="ham", spam_label="spam"):
+        self.ham_score = ham_score
+        self.spam_cues = spam_cues
+        self.confidence = confidence
+        self.ham_label = ham_label
+        self.spam_label = spam_label
+        self.decided = {ham_label: 0, spam_label: 0}
+        self.passed = 0
+
+    def _prediction(self, label):
+        other = self.spam_label if label == self.ham_label else self.ham_label
+        return {
+            "label": label,
+            "confidence": self.confidence,
+            "probabilities": {label: self.confidence, other: round(1.0 - self.confidence, 12)},
+            "stage": "rules",
+        }
+
+    def decide(self, sms_lower):
+        """Rule prediction for a lowercased message, or None"""
+        cues = spam_cues(sms_lower)
+        if cues == 0:
+            if structure_score(sms_lower) >= self.ham_score:
+                return self._prediction(self.ham_label)
+        elif self.spam_cues and cues >= self.spam_cues and structure_score(sms_lower) < 2:
+            return self._prediction(self.spam_label)
+        return None
+
+    def decide_many(self, messages, lowered=None):
+        """decide() for each message; ``lowered`` is their lowercase text if known"""
+        if lowered is None:
+            lowered = [message.lower() if isinstance(message, str) else "" for message in messages]
+        decisions = [self.decide(sms_lower) for sms_lower in lowered]
+        for decision in decisions:
+            if decision is None:
+                self.passed += 1
+            else:
+                self.decided[decision["label"]] += 1
+        return decisions
+
+    def stats(self):
+        decided = sum(self.decided.values())
+        total = decided + self.passed
+        return {
+            "ham_score": self.ham_score,
+            "spam_cues": self.spam_cues,
+            "confidence": self.confidence,
+            "decided": dict(self.decided),
+            "to_model": self.passed,
+            "model_calls_saved": decided / total if total else 0.0,
+        }
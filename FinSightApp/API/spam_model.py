@@ -0,0 +1,123 @@
+"""
+Background loading and warmup of the spam model.
+
+The API starts serving immediately; the model backend and its pickled
+artifacts load in a daemon thread started at application startup (or by
+the first /predict-spam call). A warmup forward pass on a dummy batch runs
+before the model is marked ready, so the first real request does not pay
+for graph tracing, allocator growth or interpreter tensor allocation.
+
+States: not_started -> loading -> warming_up -> ready, or failed. A failed
+load keeps the API up; /predict-spam then answers "unknown" as before.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from inference_backends import SPAM_MODEL_BACKEND, SPAM_MODEL_DIR, create_backend, load_artifacts
+
+SPAM_MODEL_WARMUP_BATCH = int(os.getenv("SPAM_MODEL_WARMUP_BATCH", "8"))
+# How long /predict-spam waits for a warming model before answering 503
+SPAM_MODEL_READY_TIMEOUT = float(os.getenv("SPAM_MODEL_READY_TIMEOUT", "5"))
+SPAM_MODEL_RETRY_AFTER = int(os.getenv("SPAM_MODEL_RETRY_AFTER", "10"))
+
+LoadedModel = namedtuple("LoadedModel", "tokenizer label_encoder max_len model")
+
+
+class SpamModel:
+    def __init__(self, backend=SPAM_MODEL_BACKEND, model_dir=SPAM_MODEL_DIR,
+                 warmup_batch=SPAM_MODEL_WARMUP_BATCH):
+        self.backend = backend
+        self.model_dir = model_dir
+        self.warmup_batch = max(1, int(warmup_batch))
+        self.state = "not_started"
+        self.error = None
+        self.loaded = None  # LoadedModel once ready
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @property
+    def pending(self):
+        """Still loading (or not started); a wait may end with a model"""
+        return self.state in ("not_started", "loading", "warming_up")
+
+    def start(self):
+        """Start loading in a daemon thread; no-op if already started"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = "loading"
+            self._thread = threading.Thread(target=self.load, name="spam-model-loader", daemon=True)
+            self._thread.start()
+
+    def install(self, loaded):
+        """Use an already loaded model (e.g. a stub in load tests) as the ready one"""
+        with self._lock:
+            # start() is a no-op once a thread is recorded
+            self._thread = threading.current_thread()
+            self.loaded = loaded
+            self.state = "ready"
+        self._ready.set()
+
+    def load(self):
+        started = time.perf_counter()
+        try:
+            self.state = "loading"
+            model = create_backend(self.backend, self.model_dir)
+            tokenizer, label_encoder, max_len = load_artifacts(
+                self.model_dir, lightweight=model.lightweight_artifacts
+            )
+            self.load_seconds = time.perf_counter() - started
+            print(f"✅ Spam detection model loaded in {self.load_seconds:.2f}s (backend: {model.name})")
+            print(f"📊 Model input shape: {model.input_shape}")
+            print(f"📊 Model output shape: {model.output_shape}")
+
+            self.state = "warming_up"
+            warmup_started = time.perf_counter()
+            self._warmup(LoadedModel(tokenizer, label_encoder, max_len, model))
+            self.warmup_seconds = time.perf_counter() - warmup_started
+            print(f"🔥 Spam model warmed up in {self.warmup_seconds:.2f}s")
+
+            self.loaded = LoadedModel(tokenizer, label_encoder, max_len, model)
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"⚠️ Warning: Could not load spam detection model: {e}")
+            print("📱 SMS financial summary will still work without spam detection.")
+        finally:
+            self._ready.set()
+
+    def _warmup(self, loaded):
+        loaded.tokenizer.texts_to_sequences(["warmup message 1,000 RWF"])
+        # The two shapes seen most: single messages and small batches
+        for rows in sorted({1, self.warmup_batch}):
+            loaded.model.predict(np.zeros((rows, loaded.max_len), dtype=np.int32))
+
+    def wait(self, timeout=None):
+        """Block until loading finished; True if the model is ready"""
+        self._ready.wait(timeout)
+        return self.ready
+
+    def status(self):
+        model = self.loaded.model if self.loaded else None
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "backend": self.backend,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "input_shape": list(model.input_shape) if model is not None else None,
+            "error": self.error,
+        }
@@ -0,0 +1,140 @@
+"""
+Streaming financial summary.
+
+summarize() used to load every parsed record into a pandas DataFrame and
+build masked copies for each total. SummaryAccumulator keeps only running
+totals instead: records are added one at a time, memory does not grow with
+the batch, and two partial accumulators can be merged so chunks can be
+summarized in parallel or incrementally.
+"""
+
+from datetime import datetime
+
+TOTAL_TYPES = ('sent', 'received', 'withdrawn', 'airtime')
+# Types included in the monthly breakdown (sent + payment/airtime)
+MONTHLY_TYPES = ('sent', 'airtime')
+
+
+def _date_key(date):
+    """Zero-padded 'YYYY-MM-DD' so string order is date order
+
+    parse_sms formats years below 1000 without padding ('762-05-03').
+    """
+    if date is None or len(date) == 10:
+        return date
+    return date.zfill(10)
+
+
+class SummaryAccumulator:
+    """Running totals for the /predict-sms summary
+
+    Produces the same dict the pandas implementation did, including the
+    latest_balance rule: the balance of the most recent dated message, ties
+    going to the earliest message; if no message with a balance has a date,
+    the first balance seen.
+    """
+
+    def __init__(self):
+        self.transactions_count = 0
+        self.amount_transactions_count = 0
+        self.totals = {tx_type: 0.0 for tx_type in TOTAL_TYPES}
+        self.monthly = {}  # 'YYYY-MM' -> sent + airtime amount
+        self.dated_balance = None  # (date, position, balance)
+        self.undated_balance = None  # (position, balance)
+
+    def add(self, record):
+        """Fold one parse_sms() record into the totals"""
+        position = self.transactions_count
+        self.transactions_count += 1
+
+        tx_type = record['type']
+        amount = record['amount']
+        date = _date_key(record['date'])
+
+        # Only records with an amount and a known type are transactions
+        if amount > 0 and tx_type != 'other':
+            self.amount_transactions_count += 1
+            if tx_type in self.totals:
+                self.totals[tx_type] += amount
+            if tx_type in MONTHLY_TYPES and date is not None:
+                month = date[:7]
+                self.monthly[month] = self.monthly.get(month, 0.0) + amount
+
+        balance = record['balance']
+        if balance is not None:
+            if date is not None:
+                # Dates are 'YYYY-MM-DD' strings, so string order is date order
+                if self.dated_balance is None or date > self.dated_balance[0]:
+                    self.dated_balance = (date, position, balance)
+            elif self.undated_balance is None:
+                self.undated_balance = (position, balance)
+
+    def merge(self, other):
+        """Append the records summarized by ``other`` after this one's"""
+        offset = self.transactions_count
+        self.transactions_count += other.transactions_count
+        self.amount_transactions_count += other.amount_transactions_count
+        for tx_type, total in other.totals.items():
+            self.totals[tx_type] += total
+        for month, total in other.monthly.items():
+            self.monthly[month] = self.monthly.get(month, 0.0) + total
+
+        if other.dated_balance is not None:
+            date, position, balance = other.dated_balance
+            if self.dated_balance is None or date > self.dated_balance[0]:
+                self.dated_balance = (date, position + offset, balance)
+        if self.undated_balance is None and other.undated_balance is not None:
+            position, balance = other.undated_balance
+            self.undated_balance = (position + offset, balance)
+        return self
+
+    def to_state(self):
+        """JSON-serializable snapshot, restored with from_state()"""
+        return {
+            "transactions_count": self.transactions_count,
+            "amount_transactions_count": self.amount_transactions_count,
+            "totals": dict(self.totals),
+            "monthly": dict(self.monthly),
+            "dated_balance": list(self.dated_balance) if self.dated_balance else None,
+            "undated_balance": list(self.undated_balance) if self.undated_balance else None,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls()
+        accumulator.transactions_count = state["transactions_count"]
+        accumulator.amount_transactions_count = state["amount_transactions_count"]
+        accumulator.totals.update(state["totals"])
+        accumulator.monthly = dict(state["monthly"])
+        if state["dated_balance"]:
+            accumulator.dated_balance = tuple(state["dated_balance"])
+        if state["undated_balance"]:
+            accumulator.undated_balance = tuple(state["undated_balance"])
+        return accumulator
+
+    def latest_balance(self):
+        if self.dated_balance is not None:
+            return float(self.dated_balance[2])
+        if self.undated_balance is not None:
+            return float(self.undated_balance[1])
+        return None
+
+    def monthly_summary(self):
+        """Sent + airtime per month, keyed like 'July 2025' and sorted by key"""
+        named = {
+            datetime(int(month[:4]), int(month[5:7]), 1).strftime('%B %Y'): total
+            for month, total in self.monthly.items()
+        }
+        return {name: named[name] for name in sorted(named)}
+
+    def summary(self):
+        return {
+            "total_sent": self.totals['sent'],
+            "total_received": self.totals['received'],
+            "total_withdrawn": self.totals['withdrawn'],
+            "total_airtime": self.totals['airtime'],
+            "latest_balance": self.latest_balance(),
+            "transactions_count": self.transactions_count,  # All messages processed
+            "amount_transactions_count": self.amount_transactions_count,  # Only messages with amounts
+            "monthly_summary": self.monthly_summary()  # Only sent + payment amounts
+        }
@@ -0,0 +1,98 @@
+"""
+Per-device summary state for incremental /predict-sms calls.
+
+The app used to re-send its whole inbox on every refresh. With the
+incremental endpoint the server keeps each device's SummaryAccumulator in
+a local SQLite file, together with the client's message cursor, so later
+calls only carry the messages added since that cursor.
+
+SQLite is shared by all uvicorn workers on the instance; updates run in an
+IMMEDIATE transaction so concurrent calls for the same device cannot both
+apply on top of the same cursor.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from summary import SummaryAccumulator
+
+SUMMARY_STORE_PATH = os.getenv("SUMMARY_STORE_PATH", "summary_state.db")
+
+
+class CursorMismatch(Exception):
+    """The client's since_cursor does not match the stored cursor"""
+
+    def __init__(self, stored_cursor):
+        super().__init__(f"Stored cursor is {stored_cursor!r}")
+        self.stored_cursor = stored_cursor
+
+
+class SummaryStore:
+    def __init__(self, path=SUMMARY_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        # One connection per thread; FastAPI runs sync handlers in a pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS device_summaries ("
+                " device_id TEXT PRIMARY KEY,"
+                " cursor TEXT,"
+                " state TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def load(self, device_id):
+        """(cursor, SummaryAccumulator) for a device, or None if unknown"""
+        row = self._connect().execute(
+            "SELECT cursor, state FROM device_summaries WHERE device_id = ?", (device_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], SummaryAccumulator.from_state(json.loads(row[1]))
+
+    def apply(self, device_id, since_cursor, cursor, accumulator, reset=False):
+        """Append ``accumulator`` to the device's state and move its cursor
+
+        Raises CursorMismatch unless ``since_cursor`` is the cursor stored
+        by the previous call (None for a device the server has not seen).
+        ``reset`` discards any stored state first.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT cursor, state FROM device_summaries WHERE device_id = ?", (device_id,)
+            ).fetchone()
+            if reset or row is None:
+                if row is None and since_cursor is not None and not reset:
+                    raise CursorMismatch(None)
+                state = SummaryAccumulator()
+            else:
+                if since_cursor != row[0]:
+                    raise CursorMismatch(row[0])
+                state = SummaryAccumulator.from_state(json.loads(row[1]))
+
+            state.merge(accumulator)
+            conn.execute(
+                "INSERT OR REPLACE INTO device_summaries (device_id, cursor, state, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                (device_id, cursor, json.dumps(state.to_state()), time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+    def delete(self, device_id):
+        self._connect().execute("DELETE FROM device_summaries WHERE device_id = ?", (device_id,))
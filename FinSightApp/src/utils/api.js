@@ -136,6 +136,35 @@ export async function getSmsSummary(messages) {
   }
 }
 
+// Incremental financial summary: only the messages added since `sinceCursor`
+// are uploaded, the server keeps the running totals per device.
+// Returns { summary, cursor } or { conflict: true, cursor } when the server's
+// cursor differs (resend messages after the returned cursor, or pass reset).
+export async function getSmsSummaryIncremental(deviceId, messages, cursor, sinceCursor = null, reset = false) {
+  const response = await fetch(`${API_BASE_URL}/predict-sms/incremental`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      device_id: deviceId,
+      messages,
+      cursor: String(cursor),
+      since_cursor: sinceCursor === null ? null : String(sinceCursor),
+      reset,
+    }),
+  });
+
+  if (response.status === 409) {
+    const data = await response.json();
+    return { conflict: true, cursor: data.detail?.cursor ?? null };
+  }
+  if (!response.ok) {
+    throw new Error(`API error: ${response.status} ${response.statusText}`);
+  }
+
+  const data = await response.json();
+  return { summary: data, cursor: data.cursor };
+}
+
 export async function scanMessages(messages) {
   try {
     // Ensure messages is always an array